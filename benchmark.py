@@ -0,0 +1,370 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from halma import Halma, HalmaBot2000, MonteCarloBot, format_move
+from tournament import parse_option
+
+# plies of random forward moves played from the start for the mid-game positions
+MIDGAME_PLIES = {8: 16, 10: 24, 16: 40}
+# perft counts of the benchmark positions, every run is checked against them
+EXPECTED_PERFT: dict[str, list[int]] = {
+    "standard_8": [24, 576, 18394],
+    "midgame_8": [55, 2794, 153667],
+    "standard_10": [24, 576, 18384],
+    "midgame_10": [49, 2179, 110368],
+    "standard_16": [24, 576, 18384],
+    "midgame_16": [45, 2880, 135104],
+}
+
+
+def perft(game: Halma, depth: int) -> int:
+    """Counts the move sequences of length depth from the game's position
+
+    A position where the player who just moved has won is a leaf.
+    """
+    if depth == 0:
+        return 1
+
+    moves = game.get_legal_moves(game.player_turn)
+    if depth == 1:
+        return len(moves)
+
+    total = 0
+    for move in moves:
+        game.apply_move(move)
+        if game._check_victory(game.move_stack[-1][1]):
+            total += 1
+        else:
+            total += perft(game, depth - 1)
+        game.undo_move()
+
+    return total
+
+
+def create_position(grid_size: int, plies: int = 0, seed: int = 0) -> Halma:
+    """Returns a headless game after plies random moves from the start position"""
+    game = Halma(grid_size, 1, "red", headless=True)
+    rng = random.Random(seed)
+    for _ in range(plies):
+        # sorted, so the positions don't depend on move generation order
+        moves = sorted(game.get_legal_moves(game.player_turn))
+        if not moves:
+            break
+        game.apply_move(rng.choice(moves))
+    game.move_stack.clear()  # the position is the new starting point
+    return game
+
+
+def time_calls(function, repeats: int) -> float:
+    """Returns the average seconds per call of function"""
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start_time) / repeats
+
+
+def _generate_moves_uncached(bot: HalmaBot2000, player: int) -> list[int]:
+    """Returns the moves of player with every destination searched again"""
+    cache = bot.game.destination_cache
+    cache[player] = [None] * len(cache[player])
+    return bot._get_all_possible_moves(player)
+
+
+def search(
+    game: Halma, depth: int, options: dict[str, object]
+) -> tuple[int, int, float, int]:
+    """Runs a fixed depth search, returns (nodes, leaf evaluations, seconds,
+    move)"""
+    bot = HalmaBot2000(game, 1_000_000, None)
+    bot.max_depth = depth
+    bot.use_opening_book = False  # the start positions would be book hits
+    for option, value in options.items():
+        setattr(bot, option, value)
+
+    start_time = time.perf_counter()
+    move = bot.determine_best_move()
+    seconds = time.perf_counter() - start_time
+    return bot.nodes_searched, bot.boards_analyzed, seconds, move
+
+
+def monte_carlo_search(game: Halma, playouts: int) -> tuple[MonteCarloBot, float]:
+    """Runs a fixed number of playouts, returns the bot and the seconds taken"""
+    bot = MonteCarloBot(game, 1_000_000)
+    bot.max_playouts = playouts
+    bot.rng.seed(0)  # the same tree on every run
+
+    start_time = time.perf_counter()
+    _ = bot.determine_best_move()
+    return bot, time.perf_counter() - start_time
+
+
+def benchmark_position(
+    name: str,
+    game: Halma,
+    perft_depth: int,
+    search_depth: int,
+    repeats: int,
+    options: dict[str, object],
+    playouts: int,
+) -> dict:
+    player = game.player_turn
+    bot = HalmaBot2000(game, 1_000_000, None)
+    result: dict = {
+        "position": name,
+        "grid_size": game.grid_size,
+        "player_to_move": player,
+        "grid": game.grid,
+    }
+
+    perft_counts: list[int] = []
+    perft_seconds = 0.0
+    for depth in range(1, perft_depth + 1):
+        start_time = time.perf_counter()
+        perft_counts.append(perft(game, depth))
+        perft_seconds = time.perf_counter() - start_time
+    result["perft"] = perft_counts
+    result["perft_seconds"] = perft_seconds
+    result["perft_nodes_per_second"] = perft_counts[-1] / perft_seconds
+    # true branching factor of the game tree at this position
+    result["perft_branching_factor"] = (
+        perft_counts[-1] / perft_counts[-2]
+        if len(perft_counts) > 1
+        else perft_counts[0]
+    )
+
+    move_count = len(bot._get_all_possible_moves(player))
+    move_generation_seconds = time_calls(
+        lambda: _generate_moves_uncached(bot, player), repeats
+    )
+    # every destination served from the cache, as on a revisited position
+    cached_seconds = time_calls(lambda: bot._get_all_possible_moves(player), repeats)
+    result["move_generation"] = {
+        "moves": move_count,
+        "seconds_per_call": move_generation_seconds,
+        "moves_per_second": move_count / move_generation_seconds,
+        "cached_seconds_per_call": cached_seconds,
+        "cached_moves_per_second": move_count / cached_seconds,
+    }
+    result["scoring"] = {
+        "board_quality_seconds": time_calls(bot._determine_board_quality, repeats),
+        "full_score_seconds": time_calls(
+            lambda: bot.game._calculate_score(player), repeats
+        ),
+    }
+
+    # the bot always searches for the player to move in the game it is given
+    previous_nodes, _, _, _ = search(game, search_depth - 1, options)
+    nodes, leaf_evaluations, seconds, move = search(game, search_depth, options)
+    result["search"] = {
+        "depth": search_depth,
+        "best_move": format_move(move, game.grid_size),
+        "nodes": nodes,
+        "leaf_evaluations": leaf_evaluations,
+        "seconds": seconds,
+        "nodes_per_second": nodes / seconds if seconds else 0.0,
+        "leaf_evaluations_per_second": leaf_evaluations / seconds if seconds else 0.0,
+        # nodes searched by one more ply of iterative deepening
+        "effective_branching_factor": nodes / previous_nodes if previous_nodes else 0.0,
+    }
+
+    if playouts:
+        monte_carlo_bot, seconds = monte_carlo_search(game, playouts)
+        result["mcts"] = {
+            "playouts": monte_carlo_bot.boards_analyzed,
+            "best_move": format_move(monte_carlo_bot.stats.move, game.grid_size),
+            "win_chance": monte_carlo_bot.stats.score,
+            "tree_depth": monte_carlo_bot.stats.depth,
+            "seconds": seconds,
+            "playouts_per_second": monte_carlo_bot.boards_analyzed / seconds,
+        }
+
+    return result
+
+
+def run_benchmarks(
+    grid_sizes: list[int],
+    perft_depth: int,
+    search_depth: int,
+    repeats: int,
+    options: dict[str, object],
+    playouts: int = 0,
+) -> dict:
+    results: list[dict] = []
+    for grid_size in grid_sizes:
+        positions = {
+            "standard": create_position(grid_size),
+            "midgame": create_position(grid_size, MIDGAME_PLIES[grid_size], grid_size),
+        }
+        for name, game in positions.items():
+            results.append(
+                benchmark_position(
+                    f"{name}_{grid_size}",
+                    game,
+                    perft_depth,
+                    search_depth,
+                    repeats,
+                    options,
+                    playouts,
+                )
+            )
+            print(_describe(results[-1]), file=sys.stderr)
+
+    return {
+        "commit": _get_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "settings": {
+            "perft_depth": perft_depth,
+            "search_depth": search_depth,
+            "repeats": repeats,
+            "options": options,
+            "playouts": playouts,
+        },
+        "results": results,
+    }
+
+
+def check_perft(report: dict) -> list[str]:
+    """Returns the positions whose perft counts differ from EXPECTED_PERFT"""
+    lines: list[str] = []
+    for result in report["results"]:
+        expected = EXPECTED_PERFT[result["position"]][: len(result["perft"])]
+        if result["perft"][: len(expected)] != expected:
+            lines.append(
+                f"{result['position']}: PERFT MISMATCH "
+                f"{result['perft'][: len(expected)]} != expected {expected}"
+            )
+    return lines
+
+
+def compare(report: dict, baseline: dict) -> list[str]:
+    """Returns perft mismatches and speed ratios of report against baseline
+
+    Speeds are only compared when both reports searched with the same
+    settings, perft counts are compared up to the shallower depth.
+    """
+    lines: list[str] = []
+    differences = [
+        f"{setting} {report['settings'].get(setting)!r} != "
+        f"{baseline['settings'].get(setting)!r}"
+        for setting in ("search_depth", "options", "playouts")
+        if report["settings"].get(setting) != baseline["settings"].get(setting)
+    ]
+    same_settings = not differences
+    if differences:
+        lines.append(f"SETTINGS DIFFER, speeds not compared: {', '.join(differences)}")
+    baseline_results = {result["position"]: result for result in baseline["results"]}
+    for result in report["results"]:
+        previous = baseline_results.get(result["position"])
+        if previous is None:
+            continue
+        depth = min(len(result["perft"]), len(previous["perft"]))
+        if result["perft"][:depth] != previous["perft"][:depth]:
+            lines.append(
+                f"{result['position']}: PERFT MISMATCH "
+                f"{result['perft'][:depth]} != {previous['perft'][:depth]}"
+            )
+        if not same_settings:
+            continue
+        for section, key in (
+            ("move_generation", "moves_per_second"),
+            ("search", "nodes_per_second"),
+            ("mcts", "playouts_per_second"),
+        ):
+            if section in result and section in previous and previous[section][key]:
+                ratio = result[section][key] / previous[section][key]
+                lines.append(f"{result['position']}: {section} {ratio:.2f}x")
+    return lines
+
+
+def _describe(result: dict) -> str:
+    description = (
+        f"{result['position']}: perft {result['perft']}, "
+        f"{result['move_generation']['moves_per_second']:.0f} moves/s generated, "
+        f"depth {result['search']['depth']} search "
+        f"{result['search']['nodes_per_second']:.0f} nodes/s "
+        f"(ebf {result['search']['effective_branching_factor']:.2f})"
+    )
+    if "mcts" in result:
+        description += f", {result['mcts']['playouts_per_second']:.0f} playouts/s"
+    return description
+
+
+def _get_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _parse_arguments(arguments: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Perft counts and move generation, scoring and search speed"
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", choices=(8, 10, 16), default=[8, 10, 16]
+    )
+    parser.add_argument("--perft-depth", type=int, default=3)
+    parser.add_argument("--search-depth", type=int, default=3)
+    parser.add_argument(
+        "--repeats", type=int, default=200, help="calls per timed function"
+    )
+    parser.add_argument(
+        "--set",
+        type=parse_option,
+        action="append",
+        default=[],
+        metavar="OPTION=VALUE",
+        help="bot attribute for the search, e.g. use_move_ordering=false",
+    )
+    parser.add_argument(
+        "--playouts", type=int, default=1000, help="monte carlo playouts, 0 to skip"
+    )
+    parser.add_argument("--output", help="json file to write, stdout if not given")
+    parser.add_argument("--compare", help="earlier json report to compare against")
+    return parser.parse_args(arguments)
+
+
+if __name__ == "__main__":
+    arguments = _parse_arguments(sys.argv[1:])
+    if arguments.search_depth < 1:
+        print("search depth must be at least 1")
+        sys.exit(1)
+
+    report = run_benchmarks(
+        arguments.sizes,
+        arguments.perft_depth,
+        arguments.search_depth,
+        arguments.repeats,
+        dict(arguments.set),
+        arguments.playouts,
+    )
+
+    if arguments.output:
+        with open(arguments.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    comparison = check_perft(report)
+    if arguments.compare:
+        with open(arguments.compare) as baseline_file:
+            comparison += compare(report, json.load(baseline_file))
+    for line in comparison:
+        print(line, file=sys.stderr)
+    if any("PERFT MISMATCH" in line for line in comparison):
+        sys.exit(1)
+    sys.exit(0)
@@ -0,0 +1,223 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator
+
+from game_state import GameState, format_move
+
+# file magic, then every game as a header followed by its moves
+MAGIC = b"HALMAGR1"
+# board size, seconds per move, result and move count of one game
+HEADER = struct.Struct(">BHBI")
+# a packed move, see encode_move
+MOVE = struct.Struct(">H")
+
+# results besides the winning player
+NO_WINNER = 0  # drawn, stopped at a move limit or abandoned
+IN_PROGRESS = 0xFF  # the move count isn't written yet, moves run to the end
+
+
+@dataclass
+class GameRecord:
+    """One game of a record file, moves are decoded when asked for"""
+
+    grid_size: int
+    timeout: int
+    winner: int | None
+    finished: bool
+    move_bytes: memoryview
+
+    @property
+    def moves(self) -> list[int]:
+        return [move for (move,) in MOVE.iter_unpack(self.move_bytes)]
+
+    def __len__(self) -> int:
+        return len(self.move_bytes) // MOVE.size
+
+
+def iter_records(data: bytes | mmap.mmap) -> Iterator[tuple[int, GameRecord]]:
+    """Yields the (header offset, record) of every game in a record file's bytes"""
+    if data[: len(MAGIC)] != MAGIC:
+        raise ValueError("not a game record file")
+
+    view = memoryview(data)
+    offset = len(MAGIC)
+    while offset + HEADER.size <= len(data):
+        grid_size, timeout, result, move_count = HEADER.unpack_from(data, offset)
+        moves_start = offset + HEADER.size
+        if result == IN_PROGRESS:
+            move_count = (len(data) - moves_start) // MOVE.size
+        moves_end = moves_start + move_count * MOVE.size
+        yield offset, GameRecord(
+            grid_size,
+            timeout,
+            result if result not in (NO_WINNER, IN_PROGRESS) else None,
+            result != IN_PROGRESS,
+            view[moves_start:moves_end],
+        )
+        offset = moves_end
+
+
+class GameRecordWriter:
+    """Appends games to a record file a move at a time
+
+    Each move is written as it is played. The header is rewritten with the
+    result and move count when the game finishes, so a game cut short is
+    still read back up to its last move.
+    """
+
+    def __init__(self, path: str):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file: BinaryIO = open(path, "w+b" if new_file else "r+b")
+        if new_file:
+            _ = self.file.write(MAGIC)
+        else:
+            self._close_unfinished_game()
+        _ = self.file.seek(0, os.SEEK_END)
+        # where the header of the game being written starts
+        self.header_offset: int | None = None
+        self.grid_size: int = 0
+        self.timeout: int = 0
+        self.move_count: int = 0
+
+    def start_game(self, grid_size: int, timeout: int) -> None:
+        """Starts a game from the standard start position"""
+        self.finish_game(None)
+        self.header_offset = self.file.tell()
+        self.grid_size, self.timeout, self.move_count = grid_size, timeout, 0
+        _ = self.file.write(HEADER.pack(grid_size, timeout, IN_PROGRESS, 0))
+
+    def write_move(self, move: int) -> None:
+        _ = self.file.write(MOVE.pack(move))
+        # flushed so the move survives the writer stopping before the game ends
+        self.file.flush()
+        self.move_count += 1
+
+    def finish_game(self, winner: int | None) -> None:
+        """Writes the result of the game being recorded, if there is one"""
+        if self.header_offset is None:
+            return None
+        _ = self.file.seek(self.header_offset)
+        _ = self.file.write(
+            HEADER.pack(
+                self.grid_size, self.timeout, winner or NO_WINNER, self.move_count
+            )
+        )
+        _ = self.file.seek(0, os.SEEK_END)
+        self.file.flush()
+        self.header_offset = None
+
+    def write_game(
+        self, grid_size: int, timeout: int, winner: int | None, moves: list[int]
+    ) -> None:
+        """Records a whole game at once"""
+        self.start_game(grid_size, timeout)
+        _ = self.file.write(b"".join(MOVE.pack(move) for move in moves))
+        self.move_count = len(moves)
+        self.finish_game(winner)
+
+    def close(self) -> None:
+        self.finish_game(None)
+        self.file.close()
+
+    def _close_unfinished_game(self) -> None:
+        # a game left in progress would swallow the games appended after it,
+        # the file is mapped rather than read as it may hold many games
+        last_game = None
+        with mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for offset, record in iter_records(data):
+                last_game = (
+                    offset,
+                    record.grid_size,
+                    record.timeout,
+                    record.finished,
+                    len(record),
+                )
+                del record  # its moves point into the map, which can't close under them
+        if last_game is not None and not last_game[3]:
+            offset, grid_size, timeout, _, move_count = last_game
+            _ = self.file.seek(offset)
+            _ = self.file.write(HEADER.pack(grid_size, timeout, NO_WINNER, move_count))
+            # drop half a move, if the writer stopped in the middle of one
+            _ = self.file.truncate(offset + HEADER.size + move_count * MOVE.size)
+
+
+class GameRecordReader:
+    """Games of a record file, read through a memory map one game at a time"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as record_file:
+            # the mapping stays open after the file is closed
+            self.data: mmap.mmap = mmap.mmap(
+                record_file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        if self.data[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a game record file")
+
+    def __iter__(self) -> Iterator[GameRecord]:
+        for _, record in iter_records(self.data):
+            yield record
+
+
+def replay(record: GameRecord, ply: int | None = None) -> GameState:
+    """Returns the position after the first ply moves of a game, all if None
+
+    The moves are made with apply_move, so undo_move steps back through them.
+    """
+    game = GameState(record.grid_size)
+    for move in record.moves[:ply]:
+        game.apply_move(move)
+    return game
+
+
+def _parse_arguments(arguments: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Summarize or replay recorded games")
+    parser.add_argument("path", help="game record file")
+    parser.add_argument("--game", type=int, help="index of a game to print")
+    parser.add_argument(
+        "--ply", type=int, help="print the game's board after this many moves"
+    )
+    return parser.parse_args(arguments)
+
+
+if __name__ == "__main__":
+    arguments = _parse_arguments(sys.argv[1:])
+    reader = GameRecordReader(arguments.path)
+
+    if arguments.game is None:
+        games = wins_1 = wins_2 = unfinished = moves = 0
+        for record in reader:
+            games += 1
+            moves += len(record)
+            wins_1 += record.winner == 1
+            wins_2 += record.winner == 2
+            unfinished += not record.finished
+        print(f"{games} games, {moves / games if games else 0.0:.1f} moves on average")
+        print(
+            f"  player 1 won {wins_1}, player 2 won {wins_2}, no winner {games - wins_1 - wins_2}"
+        )
+        if unfinished:
+            print("  the last game is still being written")
+        sys.exit(0)
+
+    record = next(
+        (record for index, record in enumerate(reader) if index == arguments.game),
+        None,
+    )
+    if record is None:
+        print(f"there is no game {arguments.game}")
+        sys.exit(1)
+
+    if arguments.ply is None:
+        print(
+            f"{record.grid_size}x{record.grid_size}, {record.timeout}s per move, "
+            f"winner {record.winner}"
+        )
+        print(" ".join(format_move(move, record.grid_size) for move in record.moves))
+    else:
+        for row in replay(record, arguments.ply).grid:
+            print("".join(".12"[square] for square in row))
+    sys.exit(0)
@@ -0,0 +1,551 @@
+import random
+from functools import cache
+from typing import Iterator
+
+# rules
+FIRST_ROW_PAWN_COUNT = 4
+
+# (row, col) offsets of the 8 squares surrounding a pawn
+DIRECTIONS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+class BoardGeometry:
+    """Per square neighbor and jump tables of a board size"""
+
+    def __init__(self, size: int):
+        self.size: int = size
+        # mask of the squares one step away from each square
+        self.step_masks: list[int] = []
+        # (jumped over square bit, landing square bit, landing square) of
+        # every jump from each square that stays on the board
+        self.jumps: list[tuple[tuple[int, int, int], ...]] = []
+        # mask of the jumped over and landing squares of those jumps
+        self.jump_masks: list[int] = []
+
+        for square in range(size * size):
+            row_index, col_index = divmod(square, size)
+            step_mask = 0
+            jumps: list[tuple[int, int, int]] = []
+            for delta_row, delta_col in DIRECTIONS:
+                if not self._on_board(row_index + delta_row, col_index + delta_col):
+                    continue
+                over = (row_index + delta_row) * size + col_index + delta_col
+                step_mask |= 1 << over
+                if self._on_board(row_index + 2 * delta_row, col_index + 2 * delta_col):
+                    landing = over + delta_row * size + delta_col
+                    jumps.append((1 << over, 1 << landing, landing))
+            self.step_masks.append(step_mask)
+            self.jumps.append(tuple(jumps))
+            jump_mask = 0
+            for over_bit, landing_bit, _ in jumps:
+                jump_mask |= over_bit | landing_bit
+            self.jump_masks.append(jump_mask)
+
+    def _on_board(self, row_index: int, col_index: int) -> bool:
+        return 0 <= row_index < self.size and 0 <= col_index < self.size
+
+
+@cache
+def get_board_geometry(size: int) -> BoardGeometry:
+    return BoardGeometry(size)
+
+
+def iter_squares(mask: int) -> Iterator[int]:
+    """Yields the index of every set bit in mask, lowest first"""
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+
+def encode_move(start_square: int, dest_square: int) -> int:
+    """Packs a move into one int, boards have at most 256 squares"""
+    return start_square << 8 | dest_square
+
+
+def decode_move(move: int) -> tuple[int, int]:
+    """Returns the (start square, dest square) of a packed move"""
+    return move >> 8, move & 0xFF
+
+
+def format_move(move: int, size: int) -> str:
+    """Returns a packed move as text, e.g. "a1->b2" """
+    start, end = (
+        f"{chr(ord('a') + square % size)}{square // size + 1}"
+        for square in decode_move(move)
+    )
+    return f"{start}->{end}"
+
+
+def parse_move(text: str, size: int) -> int:
+    """Returns the packed move for text such as "a1->b2"
+
+    Raises ValueError if the text is malformed or names a square off the board.
+    """
+    coordinates = text.strip().split("->")
+    if len(coordinates) != 2:
+        raise ValueError(f"expected a move like a1->b2, got {text!r}")
+
+    squares: list[int] = []
+    for coordinate in coordinates:
+        col_index = ord(coordinate[:1] or " ") - ord("a")
+        row_index = int(coordinate[1:]) - 1
+        if not (0 <= row_index < size and 0 <= col_index < size):
+            raise ValueError(f"{coordinate!r} is not on the board")
+        squares.append(row_index * size + col_index)
+
+    return encode_move(*squares)
+
+
+def parse_board(text: str) -> list[list[int]]:
+    """Returns the grid of a board string such as "11../1.../...2/..22"
+
+    Rows run from row 1 and are split by "/", "." is an empty square and
+    "1"/"2" a player's pawn. Raises ValueError if the text is malformed.
+    """
+    rows = text.strip().split("/")
+    if len(rows) not in (8, 10, 16):
+        raise ValueError("board size may only be 8, 10, or 16")
+
+    grid: list[list[int]] = []
+    for row in rows:
+        if len(row) != len(rows) or row.strip(".12"):
+            raise ValueError(f"bad board row {row!r}")
+        grid.append([0 if square == "." else int(square) for square in row])
+
+    return grid
+
+
+def get_euclidean_distance(x1: int, y1: int, x2: int, y2: int) -> float:
+    return (((x1 - x2) ** 2) + ((y1 - y2) ** 2)) ** (1 / 2)
+
+
+@cache
+def get_camp_scores(
+    camps: tuple[tuple[int, ...], ...],
+) -> tuple[tuple[float, ...], ...]:
+    """Returns the closest opponent camp score of every square for each player
+
+    Indexed as scores[player][row * size + col], a score is 1 / (d + 1) for
+    the euclidean distance d to the nearest square of the opponent's camp.
+    """
+    size = len(camps)
+    scores: list[tuple[float, ...]] = [()]  # index 0 is unused
+
+    for player in (1, 2):
+        opponent = 2 if player == 1 else 1
+        opponent_camp_coordinates = [
+            (camp_row_index, camp_col_index)
+            for camp_row_index, camp_row in enumerate(camps)
+            for camp_col_index, camp_col in enumerate(camp_row)
+            if camp_col == opponent
+        ]
+
+        player_scores: list[float] = []
+        for row_index in range(size):
+            for col_index in range(size):
+                closest_euclidean_distance = min(
+                    get_euclidean_distance(
+                        row_index, col_index, camp_row_index, camp_col_index
+                    )
+                    for camp_row_index, camp_col_index in opponent_camp_coordinates
+                )
+                player_scores.append(1 / (closest_euclidean_distance + 1))
+        scores.append(tuple(player_scores))
+
+    return tuple(scores)
+
+
+@cache
+def get_target_camps(
+    camps: tuple[tuple[int, ...], ...],
+) -> tuple[tuple[int, ...], ...]:
+    """Returns 1 on the squares of the camp a player is heading for, else 0
+
+    Indexed tables[player][square], a player heads for the other player's camp.
+    """
+    return ((),) + tuple(
+        tuple(int(square == owner) for row in camps for square in row)
+        for owner in (2, 1)
+    )
+
+
+@cache
+def get_forward_masks(
+    camps: tuple[tuple[int, ...], ...],
+) -> tuple[tuple[int, ...], ...]:
+    """Returns, per player and square, a mask of squares scoring at least as much
+
+    A pawn may never move to a square that is further from the opponent's
+    camp, so masks[player][square] holds every destination allowed from square.
+    """
+    masks: list[tuple[int, ...]] = [()]  # index 0 is unused
+
+    for player_scores in get_camp_scores(camps)[1:]:
+        squares_by_score = sorted(
+            range(len(player_scores)), key=player_scores.__getitem__, reverse=True
+        )
+        player_masks = [0] * len(player_scores)
+        allowed = 0
+        group_start = 0
+        # walk squares from best to worst, squares with equal scores share a mask
+        while group_start < len(squares_by_score):
+            group_score = player_scores[squares_by_score[group_start]]
+            group_end = group_start
+            while (
+                group_end < len(squares_by_score)
+                and player_scores[squares_by_score[group_end]] == group_score
+            ):
+                allowed |= 1 << squares_by_score[group_end]
+                group_end += 1
+            for square in squares_by_score[group_start:group_end]:
+                player_masks[square] = allowed
+            group_start = group_end
+        masks.append(tuple(player_masks))
+
+    return tuple(masks)
+
+
+# xor'd into a position key when it is player 2's turn
+ZOBRIST_TURN_KEY = random.Random(0).getrandbits(64)
+
+
+@cache
+def get_zobrist_keys(size: int) -> tuple[tuple[int, ...], ...]:
+    """Returns a random 64 bit key per player and square, keys[player][square]
+
+    Seeded by board size so position keys are the same on every run.
+    """
+    rng = random.Random(size)
+    return ((),) + tuple(
+        tuple(rng.getrandbits(64) for _ in range(size * size)) for _ in range(2)
+    )
+
+
+class BitBoard:
+    """Logical board, each player's pawns are stored as one integer bitmask
+
+    Square (row, col) is bit row * size + col, so bits run in the same order
+    as a row by row scan of a list[list[int]] grid.
+    """
+
+    def __init__(self, size: int, pawns: list[int] | None = None):
+        self.size: int = size
+        self.geometry: BoardGeometry = get_board_geometry(size)
+        # index 0 is unused so players can index their own mask
+        self.pawns: list[int] = pawns if pawns else [0, 0, 0]
+        # squares of each player's pawns, the same pawns as the masks in no
+        # particular order, so pawns can be listed without scanning bits
+        self.squares: list[list[int]] = [
+            list(iter_squares(player_pawns)) for player_pawns in self.pawns
+        ]
+
+    @classmethod
+    def from_grid(cls, grid: list[list[int]] | tuple[tuple[int, ...], ...]):
+        board = cls(len(grid))
+        for row_index, row in enumerate(grid):
+            for col_index, square_state in enumerate(row):
+                if square_state:
+                    square = row_index * board.size + col_index
+                    board.pawns[square_state] |= 1 << square
+                    board.squares[square_state].append(square)
+        return board
+
+    def to_grid(self) -> list[list[int]]:
+        grid = [[0] * self.size for _ in range(self.size)]
+        for player in (1, 2):
+            for square in iter_squares(self.pawns[player]):
+                grid[square // self.size][square % self.size] = player
+        return grid
+
+    def copy(self):
+        return BitBoard(self.size, self.pawns.copy())
+
+    @property
+    def occupied(self) -> int:
+        return self.pawns[1] | self.pawns[2]
+
+    def get_square(self, row_index: int, col_index: int) -> int:
+        """Returns the player occupying a square, 0 if empty or out of bounds"""
+        if not (0 <= row_index < self.size and 0 <= col_index < self.size):
+            return 0
+        bit = 1 << (row_index * self.size + col_index)
+        if self.pawns[1] & bit:
+            return 1
+        if self.pawns[2] & bit:
+            return 2
+        return 0
+
+    def move_pawn(self, player: int, start_square: int, dest_square: int) -> None:
+        self.pawns[player] ^= (1 << start_square) | (1 << dest_square)
+        squares = self.squares[player]
+        squares[squares.index(start_square)] = dest_square
+
+    def get_destinations(self, square: int) -> int:
+        """Returns a mask of every square the pawn on square can reach
+
+        Single steps go to any empty neighbor, jumps hop over one adjacent
+        pawn of either color onto an empty square and may be chained.
+        """
+        geometry = self.geometry
+        occupied = self.occupied
+        steps = geometry.step_masks[square] & ~occupied
+
+        # jump chains followed with a stack, each landing square is visited once
+        jumps = 0
+        jump_table = geometry.jumps
+        frontier = [square]
+        while frontier:
+            for over, landing, landing_square in jump_table[frontier.pop()]:
+                if occupied & over and not (occupied | jumps) & landing:
+                    jumps |= landing
+                    frontier.append(landing_square)
+
+        return steps | jumps
+
+    def search_destinations(self, square: int) -> tuple[int, int]:
+        """Returns get_destinations's mask and the neighborhood of the search,
+        a mask of every square whose occupancy was looked at
+
+        The destinations only change when a pawn enters or leaves the
+        neighborhood.
+        """
+        geometry = self.geometry
+        occupied = self.occupied
+        neighborhood = geometry.step_masks[square]
+        steps = neighborhood & ~occupied
+
+        # jump chains followed with a stack, each landing square is visited once
+        jumps = 0
+        jump_table = geometry.jumps
+        jump_masks = geometry.jump_masks
+        frontier = [square]
+        while frontier:
+            jump_square = frontier.pop()
+            neighborhood |= jump_masks[jump_square]
+            for over, landing, landing_square in jump_table[jump_square]:
+                if occupied & over and not (occupied | jumps) & landing:
+                    jumps |= landing
+                    frontier.append(landing_square)
+
+        return steps | jumps, neighborhood
+
+
+@cache
+def get_camps(grid_size: int) -> tuple[tuple[int, ...], ...]:
+    """Returns the camp of every square, 0 outside the camps, else the owner"""
+    # start from an empty grid, pawns outside the camps are not camp squares
+    grid = [[0] * grid_size for _ in range(grid_size)]
+
+    for row_index in range(FIRST_ROW_PAWN_COUNT + 1):
+        player_1_row = grid[row_index]
+        player_2_row = grid[-row_index - 1]
+        for col_index in range(FIRST_ROW_PAWN_COUNT + 1 - row_index):
+            player_1_row[col_index] = 1
+            player_2_row[-col_index - 1] = 2
+
+    return tuple((tuple(row) for row in grid))
+
+
+def get_starting_grid(grid_size: int) -> list[list[int]]:
+    """Returns the grid of a new game, 0 empty, 1/2 player pawns"""
+    grid = [[0] * grid_size for _ in range(grid_size)]
+    for row_index in range(FIRST_ROW_PAWN_COUNT):
+        player_1_row = grid[row_index]
+        player_2_row = grid[-row_index - 1]
+        for col_index in range(FIRST_ROW_PAWN_COUNT - row_index):
+            player_1_row[col_index] = 1
+            player_2_row[-col_index - 1] = 2
+
+    return grid
+
+
+class GameState:
+    """Rules of the game, the board, whose turn it is and the running totals
+
+    Has no display, the bot searches one of these and Halma draws one. Per
+    board size tables are cached and shared by every state of that size.
+    """
+
+    __slots__ = (
+        "board",
+        "grid_size",
+        "camps",
+        "target_camps",
+        "camp_scores",
+        "forward_masks",
+        "zobrist_keys",
+        "destination_cache",
+        "player_1_score",
+        "player_2_score",
+        "pawn_key",
+        "pawns_in_camp",
+        "turn_number",
+        "player_turn",
+        "move_stack",
+    )
+
+    def __init__(self, grid_size: int, board: BitBoard | None = None):
+        # game logical board
+        self.board: BitBoard = board or BitBoard.from_grid(get_starting_grid(grid_size))
+        self.grid_size: int = self.board.size
+        # static "camps" tuple holds coordinates of camps for each team
+        self.camps: tuple[tuple[int, ...], ...] = get_camps(self.grid_size)
+        # 1 on the squares of the camp each player is heading for, by player
+        self.target_camps: tuple[tuple[int, ...], ...] = get_target_camps(self.camps)
+        # per square score and allowed (non backward) moves tables, see
+        # get_camp_scores and get_forward_masks
+        self.camp_scores: tuple[tuple[float, ...], ...] = get_camp_scores(self.camps)
+        self.forward_masks: tuple[tuple[int, ...], ...] = get_forward_masks(self.camps)
+        # zobrist keys of every pawn xor'd together make the pawn key, see
+        # position_key
+        self.zobrist_keys: tuple[tuple[int, ...], ...] = get_zobrist_keys(
+            self.grid_size
+        )
+        # (neighborhood, its occupancy, legal destinations) of the last search
+        # from each square, by player and square, see _get_valid_destinations
+        self.destination_cache: list[list[tuple[int, int, int] | None]] = [
+            [None] * (self.grid_size * self.grid_size) for _ in range(3)
+        ]
+        self.turn_number: int = 0  # total number of turns taken
+        self.player_turn: int = 1  # number of player whos turn it is
+        self.set_board(self.board)
+
+    def set_board(self, board: BitBoard) -> None:
+        """Puts a new position on the board, the player to move is kept"""
+        self.board = board
+        # kept up to date by _move_pawn, never recomputed from the whole board
+        self.player_1_score: float = self._calculate_score(1)
+        self.player_2_score: float = self._calculate_score(2)
+        self.pawn_key: int = self._calculate_pawn_key()
+        # pawns of each player inside its target camp, all of them in camp is
+        # a win
+        self.pawns_in_camp: list[int] = [
+            0,
+            self._count_pawns_in_camp(1),
+            self._count_pawns_in_camp(2),
+        ]
+        # (move, player, player's score before the move) of moves made with
+        # apply_move
+        self.move_stack: list[tuple[int, int, float]] = []
+
+    @property
+    def grid(self) -> list[list[int]]:
+        """Logical grid rebuilt from the board, 0 empty, 1/2 player pawns"""
+        return self.board.to_grid()
+
+    @property
+    def position_key(self) -> int:
+        """Zobrist key of the pawns and the player to move"""
+        if self.player_turn == 2:
+            return self.pawn_key ^ ZOBRIST_TURN_KEY
+        return self.pawn_key
+
+    def apply_move(self, move: int) -> None:
+        """Plays a packed move for the current player
+
+        Meant for searching, the move is not validated and can be reverted
+        with undo_move.
+        """
+        previous_score = (
+            self.player_1_score if self.player_turn == 1 else self.player_2_score
+        )
+        self.move_stack.append((move, self.player_turn, previous_score))
+        self._move_pawn(self.player_turn, move >> 8, move & 0xFF)
+        self.player_turn = 1 if self.player_turn == 2 else 2
+        self.turn_number += 1
+
+    def undo_move(self) -> None:
+        """Reverts the last move made with apply_move"""
+        move, player, previous_score = self.move_stack.pop()
+        start_square, dest_square = move >> 8, move & 0xFF
+        self.board.move_pawn(player, dest_square, start_square)
+        player_keys = self.zobrist_keys[player]
+        self.pawn_key ^= player_keys[start_square] ^ player_keys[dest_square]
+        target_camp = self.target_camps[player]
+        self.pawns_in_camp[player] -= (
+            target_camp[dest_square] - target_camp[start_square]
+        )
+        # restore the saved score rather than subtracting, so no float drift
+        if player == 1:
+            self.player_1_score = previous_score
+        else:
+            self.player_2_score = previous_score
+        self.player_turn = player
+        self.turn_number -= 1
+
+    def _move_pawn(self, player: int, start_square: int, dest_square: int) -> None:
+        """Moves a pawn on the board, updating the player's score, pawns in camp
+        and the pawn key"""
+        self.board.move_pawn(player, start_square, dest_square)
+        player_keys = self.zobrist_keys[player]
+        self.pawn_key ^= player_keys[start_square] ^ player_keys[dest_square]
+        target_camp = self.target_camps[player]
+        self.pawns_in_camp[player] += (
+            target_camp[dest_square] - target_camp[start_square]
+        )
+        player_scores = self.camp_scores[player]
+        score_change = player_scores[dest_square] - player_scores[start_square]
+        if player == 1:
+            self.player_1_score += score_change
+        else:
+            self.player_2_score += score_change
+
+    def _get_valid_destinations(self, player: int, square: int) -> int:
+        """Returns a mask of the squares the pawn on square may legally move to
+
+        A pawn's moves are only searched again once a pawn has entered or left
+        its neighborhood since the last search, so a move costs a search for
+        the few pawns near its start and end squares. The check is against
+        the board itself, so undoing a move needs no bookkeeping.
+        """
+        occupied = self.board.pawns[1] | self.board.pawns[2]
+        cached = self.destination_cache[player][square]
+        if cached is not None and occupied & cached[0] == cached[1]:
+            return cached[2]
+
+        destinations, neighborhood = self.board.search_destinations(square)
+        # remove move from possible moves if it is not a forward move
+        destinations &= self.forward_masks[player][square]
+        self.destination_cache[player][square] = (
+            neighborhood,
+            occupied & neighborhood,
+            destinations,
+        )
+        return destinations
+
+    def get_legal_moves(self, player: int) -> list[int]:
+        """Returns the packed moves of every pawn of player"""
+        result: list[int] = []
+        occupied = self.board.pawns[1] | self.board.pawns[2]
+        player_cache = self.destination_cache[player]
+        for start in self.board.squares[player]:
+            # _get_valid_destinations's cache check inlined, most pawns hit
+            cached = player_cache[start]
+            if cached is not None and occupied & cached[0] == cached[1]:
+                valid_moves = cached[2]
+            else:
+                valid_moves = self._get_valid_destinations(player, start)
+            packed_start = start << 8
+            result.extend([packed_start | end for end in iter_squares(valid_moves)])
+
+        return result
+
+    def _check_victory(self, player: int):
+        # every pawn of player is inside the opponent's camp
+        return self.pawns_in_camp[player] == len(self.board.squares[player])
+
+    def _calculate_score(self, player: int):
+        player_scores = self.camp_scores[player]
+        return sum(player_scores[square] for square in self.board.squares[player])
+
+    def _calculate_pawn_key(self) -> int:
+        pawn_key = 0
+        for player in (1, 2):
+            for square in self.board.squares[player]:
+                pawn_key ^= self.zobrist_keys[player][square]
+        return pawn_key
+
+    def _count_pawns_in_camp(self, player: int) -> int:
+        target_camp = self.target_camps[player]
+        return sum(target_camp[square] for square in self.board.squares[player])
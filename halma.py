@@ -1,15 +1,427 @@
-from mimetypes import init
+from __future__ import annotations
+
 import sys
-from copy import deepcopy
-import tkinter as tk
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from functools import cache
+from typing import TYPE_CHECKING, Callable, ClassVar, Iterable, Sequence, TextIO
+import json
 import math
+import mmap
+import multiprocessing
+import os
+import queue
+import random
+import struct
+import threading
 import time
 
-# rules
-FIRST_ROW_PAWN_COUNT = 4
+from game_record import GameRecordWriter
+from game_state import (
+    BitBoard,
+    GameState,
+    decode_move,
+    encode_move,
+    format_move,
+    get_camp_scores,
+    iter_squares,
+    parse_board,
+    parse_move,
+)
+
+if TYPE_CHECKING:
+    import multiprocessing.synchronize
+
+    # imported when a window is made, so headless games and bot processes
+    # never load tkinter
+    import tkinter as tk
+
+try:
+    import numpy as np
+except ImportError:  # optional, only used to evaluate wide frontiers faster
+    np = None
+
+# deepest iteration the root parallel search keeps a shared alpha for
+MAX_PARALLEL_DEPTH = 64
+# bot attributes the root parallel search's workers copy from the bot
+PARALLEL_SEARCH_SETTINGS = (
+    "max_depth",
+    "use_alpha_beta_pruning",
+    "use_principal_variation_search",
+    "use_transposition_table",
+    "use_move_ordering",
+    "use_batch_evaluation",
+)
+# worker processes start from a fresh process, a fork of the search thread
+# could copy a lock some other thread holds
+WORKER_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+# seconds between the parent's checks on its stop conditions while workers run
+WORKER_POLL_INTERVAL = 0.02
+# workers of a search without a time limit are stopped through the stop flag,
+# this only bounds how long they outlive a parent that died
+MAX_WORKER_SECONDS = 3600.0
+
+# pixels per side of a board square
+SQUARE_SIZE = 50
+
+# ms between checks on a bot search running in the background
+SEARCH_POLL_INTERVAL = 50
+
+# nodes searched between reads of the clock, a few ms worth
+TIME_CHECK_INTERVAL = 256
+
+# share of the budget after which no new iteration is started, and how many
+# times the time left an iteration may be predicted to take and still start,
+# an iteration cut short still gives the best root move searched so far
+ITERATION_START_LIMIT = 0.5
+ITERATION_OVERRUN_FACTOR = 8.0
+
+# half width of the root window around the last iteration's score, and how
+# much it grows each time the score falls outside it
+ASPIRATION_WINDOW = 1.0
+ASPIRATION_WIDENING = 4
+
+# search engine the game's bot uses on each board size, see create_bot.
+# MonteCarloBot has no opening book or pondering yet, so minimax everywhere
+BOT_ENGINES: dict[int, str] = {8: "minimax", 10: "minimax", 16: "minimax"}
+
+# exploration weight of the uct formula, higher tries less visited moves more
+UCT_EXPLORATION = 1.0
+# fast moves played from a new tree node before the position is scored
+PLAYOUT_PLIES = 8
+# pawns whose moves a playout move is picked from, the most forward one wins
+PLAYOUT_PAWN_SAMPLES = 3
+# camp score lead that makes a playout worth about 0.73, sigmoid(1)
+PLAYOUT_LEAD_SCALE = 0.5
+# playouts between reads of the clock
+MONTE_CARLO_CHECK_INTERVAL = 16
+
+# fewest frontier moves worth evaluating with numpy rather than a python loop
+NUMPY_BATCH_MIN_MOVES = 64
+
+# opening book the bot loads at startup, written by opening_book.py
+OPENING_BOOK_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "opening_book.bin"
+)
+
+
+@cache
+def get_camp_score_array(camps: tuple[tuple[int, ...], ...], player: int):
+    """Returns player's get_camp_scores table as a numpy array"""
+    return np.array(get_camp_scores(camps)[player])
+
+
+@cache
+def get_camp_square_array(camps: tuple[tuple[int, ...], ...], owner: int):
+    """Returns a numpy bool array, True on the squares of owner's camp"""
+    return np.array([square == owner for row in camps for square in row])
+
+
+class TranspositionTable:
+    """Fixed size store of searched positions keyed by zobrist key
+
+    Each bucket has two slots: one keeps the deepest search seen for the
+    bucket, the other always takes the most recent store. Entries are
+    (key, depth, bound, score, best move) tuples.
+    """
+
+    EXACT: int = 0
+    LOWER_BOUND: int = 1  # score is at least the stored score
+    UPPER_BOUND: int = 2  # score is at most the stored score
+
+    # rough bytes held by one stored entry: the tuple, its key and score
+    # objects, the move and the slot pointer
+    ENTRY_SIZE: int = (
+        sys.getsizeof((0,) * 5)
+        + sys.getsizeof(1 << 63)
+        + sys.getsizeof(0.5)
+        + sys.getsizeof((0, 0))
+        + 8
+    )
+
+    def __init__(self, size_mb: float = 16):
+        max_buckets = max(1, int(size_mb * 1024 * 1024) // (2 * self.ENTRY_SIZE))
+        # power of two bucket count so a key can be masked into an index
+        self.bucket_count: int = 1 << (max_buckets.bit_length() - 1)
+        self.index_mask: int = self.bucket_count - 1
+        self.depth_preferred: list[tuple | None] = [None] * self.bucket_count
+        self.always_replace: list[tuple | None] = [None] * self.bucket_count
+
+        self.probes: int = 0
+        self.hits: int = 0
+        self.collisions: int = 0  # bucket held only other positions
+        self.stores: int = 0
+
+    def probe(self, key: int) -> tuple | None:
+        self.probes += 1
+        index = key & self.index_mask
+        collided = False
+        for slots in (self.depth_preferred, self.always_replace):
+            entry = slots[index]
+            if entry is None:
+                continue
+            if entry[0] == key:
+                self.hits += 1
+                return entry
+            collided = True
+
+        if collided:
+            self.collisions += 1
+        return None
+
+    def store(
+        self,
+        key: int,
+        depth: int,
+        bound: int,
+        score: float,
+        best_move: int | None,
+    ) -> None:
+        self.stores += 1
+        index = key & self.index_mask
+        entry = (key, depth, bound, score, best_move)
+        deepest = self.depth_preferred[index]
+
+        if deepest is None or deepest[0] == key or depth >= deepest[1]:
+            self.depth_preferred[index] = entry
+            if deepest is not None and deepest[0] != key:
+                self.always_replace[index] = deepest  # demote the old entry
+        else:
+            self.always_replace[index] = entry
+
+    def clear(self) -> None:
+        self.depth_preferred = [None] * self.bucket_count
+        self.always_replace = [None] * self.bucket_count
+        self.probes = self.hits = self.collisions = self.stores = 0
+
+
+def _json_score(score: float | None) -> float | None:
+    """Returns score, or None for the infinite score of a won or lost position
+    that json can't hold"""
+    if score is None or not math.isfinite(score):
+        return None
+    return score
+
+
+@dataclass
+class IterationStats:
+    """Counters of one finished iteration of iterative deepening"""
+
+    depth: int
+    nodes: int
+    leaf_evaluations: int
+    cutoffs_by_ply: list[int]
+    seconds: float
+    best_move: int
+    score: float
+    principal_variation: list[int]
+    # False when time ran out, best_move is then the best root move searched
+    # in full before that
+    completed: bool = True
+
+    def to_dict(self, grid_size: int) -> dict:
+        record = asdict(self)
+        record["best_move"] = format_move(self.best_move, grid_size)
+        record["score"] = _json_score(self.score)
+        record["principal_variation"] = [
+            format_move(move, grid_size) for move in self.principal_variation
+        ]
+        return record
+
+
+@dataclass
+class SearchStats:
+    """What one search did, returned with the move by HalmaBot2000.search
+
+    to_dict gives the json schema, with moves written as text and the score
+    of a won or lost position as None. Table counts are None when the search
+    ran without a transposition table.
+    """
+
+    SCHEMA_VERSION: ClassVar[int] = 1
+
+    grid_size: int
+    player: int
+    move: int = -1
+    score: float | None = None
+    depth: int = 0
+    nodes: int = 0
+    leaf_evaluations: int = 0
+    cutoffs_by_ply: list[int] = field(default_factory=list)
+    seconds: float = 0.0
+    principal_variation: list[int] = field(default_factory=list)
+    iterations: list[IterationStats] = field(default_factory=list)
+    table_probes: int | None = None
+    table_hits: int | None = None
+    table_collisions: int | None = None
+    table_stores: int | None = None
+    # nodes, leaf evaluations and depth reached by each parallel search worker
+    workers: list[dict] = field(default_factory=list)
+    # the move came from the opening book, nothing was searched
+    book_move: bool = False
+
+    @property
+    def table_hit_rate(self) -> float | None:
+        if not self.table_probes:
+            return None
+        return self.table_hits / self.table_probes
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "schema": self.SCHEMA_VERSION,
+            "grid_size": self.grid_size,
+            "player": self.player,
+            "move": format_move(self.move, self.grid_size) if self.move >= 0 else None,
+            "score": _json_score(self.score),
+            "depth": self.depth,
+            "nodes": self.nodes,
+            "leaf_evaluations": self.leaf_evaluations,
+            "cutoffs_by_ply": self.cutoffs_by_ply,
+            "seconds": self.seconds,
+            "nodes_per_second": self.nodes_per_second,
+            "principal_variation": [
+                format_move(move, self.grid_size) for move in self.principal_variation
+            ],
+            "iterations": [
+                iteration.to_dict(self.grid_size) for iteration in self.iterations
+            ],
+            "transposition_table": (
+                None
+                if self.table_probes is None
+                else {
+                    "probes": self.table_probes,
+                    "hits": self.table_hits,
+                    "collisions": self.table_collisions,
+                    "stores": self.table_stores,
+                    "hit_rate": self.table_hit_rate,
+                }
+            ),
+            "workers": self.workers,
+            "book_move": self.book_move,
+        }
+
+
+class OpeningBook:
+    """Best moves of searched positions, read from a memory-mapped file
+
+    The file is MAGIC followed by records of a big endian 8 byte zobrist
+    position key and a 2 byte packed move, sorted by key. Keys from every
+    board size share one file.
+    """
+
+    MAGIC: bytes = b"HALMABK1"
+    RECORD: struct.Struct = struct.Struct(">QH")
+
+    def __init__(self, path: str):
+        with open(path, "rb") as book_file:
+            # the mapping stays open after the file is closed
+            self.data: mmap.mmap = mmap.mmap(
+                book_file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        if self.data[: len(self.MAGIC)] != self.MAGIC:
+            raise ValueError(f"{path} is not an opening book")
+        self.count: int = (len(self.data) - len(self.MAGIC)) // self.RECORD.size
+
+    def lookup(self, key: int) -> int | None:
+        """Returns the book move of a position key, binary searched"""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            middle_key, move = self.RECORD.unpack_from(
+                self.data, len(self.MAGIC) + middle * self.RECORD.size
+            )
+            if middle_key < key:
+                low = middle + 1
+            elif middle_key > key:
+                high = middle
+            else:
+                return move
+        return None
+
+    @classmethod
+    def write(cls, path: str, entries: dict[int, int]) -> None:
+        """Writes position key -> move entries as a book file"""
+        with open(path, "wb") as book_file:
+            _ = book_file.write(cls.MAGIC)
+            for key in sorted(entries):
+                _ = book_file.write(cls.RECORD.pack(key, entries[key]))
+
+
+@cache
+def load_opening_book(path: str = OPENING_BOOK_PATH) -> OpeningBook | None:
+    """Returns the opening book at path, None if there isn't a usable one"""
+    try:
+        return OpeningBook(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as error:
+        # an empty or damaged book only costs the book moves
+        print(f"opening book {path} not loaded: {error}", file=sys.stderr)
+        return None
+
+
+class TimeManager:
+    """Deadline of one search on the monotonic clock
 
+    The search calls check every check_interval nodes, so reading the clock
+    costs little while a search overruns its budget by a few nodes at most.
+    """
+
+    def __init__(
+        self,
+        budget: float,
+        check_interval: int = TIME_CHECK_INTERVAL,
+        stop_event: multiprocessing.synchronize.Event | None = None,
+    ):
+        self.start_time: float = time.monotonic()
+        self.budget: float = budget  # seconds, can be changed mid search
+        self.check_interval: int = check_interval
+        # node count at which the search should next call check
+        self.next_check: int = check_interval
+        # set by another process to end the search early, see _run_workers
+        self.stop_event: multiprocessing.synchronize.Event | None = stop_event
+
+    @property
+    def deadline(self) -> float:
+        return self.start_time + self.budget
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start_time
+
+    def check(self, nodes: int) -> bool:
+        """Returns True once the budget is used up or the search is stopped"""
+        self.next_check = nodes + self.check_interval
+        if self.stop_event is not None and self.stop_event.is_set():
+            return True
+        return time.monotonic() >= self.deadline
+
+    def can_finish_iteration(self, iteration_seconds: list[float]) -> bool:
+        """Guesses whether another iteration is worth starting
+
+        It isn't once most of the budget is gone, or when it is predicted to
+        take well over the time left. Each iteration is expected to grow over
+        the last by the same factor the last grew over the one before it.
+        """
+        elapsed = self.elapsed()
+        if elapsed >= self.budget * ITERATION_START_LIMIT:
+            return False
+        if len(iteration_seconds) < 2 or iteration_seconds[-2] <= 0:
+            return True
+        growth = max(1.0, iteration_seconds[-1] / iteration_seconds[-2])
+        predicted = iteration_seconds[-1] * growth
+        return predicted < (self.budget - elapsed) * ITERATION_OVERRUN_FACTOR
+
+
+class Halma(GameState):
+    """A game in a tkinter window, or headless without one"""
 
-class Halma:
     def __init__(
         self,
         grid_size: int,
@@ -18,32 +430,43 @@ class Halma:
         starting_grid: list[list[int]] | None = None,
         headless: bool = False,
     ):
-        # game logical grid
-        self.grid: list[list[int]] = (
-            starting_grid if starting_grid else self._initialize_grid(grid_size)
+        super().__init__(
+            grid_size, BitBoard.from_grid(starting_grid) if starting_grid else None
         )
         # time allowed to make move before timeout
         self.timeout: int = timeout
         # time before current turn is over
         self.time_remaining: int = timeout
-        # static "camps" tuple holds coordinates of camps for each team
-        self.camps: tuple[tuple[int, ...], ...] = self._initialize_camps(self.grid)
         # can contain "highlighted" squares (3), not used for logic
-        self.grid_display: list[list[int]] = deepcopy(self.grid)
-        # pawns (ids) displayed in tkinter window
-        self.pawns: list[list[tk.Canvas]] = []
+        self.grid_display: list[list[int]] = self.board.to_grid()
+        # board canvas and its (highlight, pawn) item ids, by square
+        self.board_canvas: tk.Canvas | None = None
+        self.square_items: list[tuple[int, int]] = []
+        # (highlight fill, pawn outline, pawn fill) last drawn on each square,
+        # so a redraw only touches squares that changed
+        self.drawn_squares: list[tuple[str, str, str] | None] = []
         # to draw or not to draw, that is the question
         self.headless: bool = headless
-
-        self.player_1_score: float = 0
-        self.player_2_score: float = 0
-        self.turn_number: int = 0  # total number of turns taken
-        self.player_turn: int = 1  # number of player whos turn it is
         self.selected: tuple[int, int] = (-1, -1)  # row, col of selected piece
         self.previous_square: tuple[int, int] = tuple()  # previous pawn position
         self.after_timer_decrement: str = ""
+        # bot searching in a worker thread, its queue of ("progress", stats
+        # record) and ("move", move) messages, see _start_bot_search
+        self.bot_search: SearchBot | None = None
+        self.bot_search_messages: queue.Queue = queue.Queue()
+        # deepest iteration the running search has finished, for the label
+        self.bot_search_depth: int = 0
+        self.bot_thread: threading.Thread | None = None
+        # kept for the whole game, it ponders on the human's turn
+        self.bot: SearchBot | None = None
+        self.after_search_poll: str = ""
+        self.winner: int | None = None  # set once the game has ended
+        # moves are appended here as they are played, see record_to
+        self.game_record: GameRecordWriter | None = None
 
         if not headless:
+            import tkinter as tk
+
             # tkinter graphical setup
             self.display: tk.Tk = tk.Tk()
             self.display.title("Halma")
@@ -86,7 +509,7 @@ class Halma:
 
             self.player_2_score_display: tk.Label = tk.Label(self.display)
 
-            self._set_player_scores()
+            self._update_score_display()
 
             self.player_2_score_display.grid(
                 row=0, column=(grid_size // 4) * 3 + 1, columnspan=grid_size // 4
@@ -104,6 +527,18 @@ class Halma:
             self.error_message.grid(
                 row=grid_size + 2, column=grid_size // 2, columnspan=grid_size // 2 + 1
             )
+
+            # bot search progress and a button to make it move right away
+            self.search_status_display: tk.Label = tk.Label(self.display)
+            self.search_status_display.grid(
+                row=grid_size + 3, column=0, columnspan=grid_size // 2
+            )
+            self.stop_search_button: tk.Button = tk.Button(
+                self.display, text="Move now", command=self._stop_bot_search
+            )
+            self.stop_search_button.grid(
+                row=grid_size + 3, column=grid_size // 2, columnspan=grid_size // 2 + 1
+            )
         else:
             self.display = None
 
@@ -118,9 +553,12 @@ class Halma:
         current_row, current_col = self.selected
 
         if self.grid_display[selected_row][selected_col] == 3:  # selected valid move
-            self.grid[current_row][current_col] = 0
-            self.grid[selected_row][selected_col] = self.player_turn
-            self.grid_display = deepcopy(self.grid)
+            start_square = current_row * self.grid_size + current_col
+            dest_square = selected_row * self.grid_size + selected_col
+            self._move_pawn(self.player_turn, start_square, dest_square)
+            if self.game_record is not None:
+                self.game_record.write_move(encode_move(start_square, dest_square))
+            self.grid_display = self.board.to_grid()
 
             # if player jumped another piece, they keep their turn, else swap turns
             self.previous_square = self.selected
@@ -135,39 +573,40 @@ class Halma:
             if self._check_victory(player):
                 self._end_game(winning_player=player)
 
-    def _process_move_input(self, robo_move: str | None) -> None:
-        if robo_move:
-            player_input = robo_move
+    def record_to(self, writer: GameRecordWriter) -> None:
+        """Records every move from here on with writer, see game_record.py
+
+        Records replay from the start position, so call it before the first
+        move. The result is written when the game ends.
+        """
+        writer.start_game(self.grid_size, self.timeout)
+        self.game_record = writer
+
+    def _process_move_input(self, robo_move: int | None) -> None:
+        if robo_move is not None:
+            move = robo_move
+        elif self.bot_search is not None:
+            return None  # not the human's turn
         else:
             player_input = self.move_input.get()
-            self.move_input.delete(0, tk.END)
-        column_base_value = ord("a")
-        try:  # some very suspicious and list unpacking
-            starting_coordinate, dest_coordinate = player_input.strip().split("->")
-
-            starting_col_char = starting_coordinate[0]
-            starting_row_index = int(starting_coordinate[1:])
-            starting_row_index = starting_row_index - 1
-            starting_col_index = ord(starting_col_char) - column_base_value
-
-            dest_col_char = dest_coordinate[0]
-            dest_row_index = int(dest_coordinate[1:])
-            dest_row_index = dest_row_index - 1
-            dest_col_index = ord(dest_col_char) - column_base_value
-
-            self._select_piece(starting_row_index, starting_col_index)
-            self.make_move(dest_row_index, dest_col_index)
-        except Exception:
-            self.make_move(-1, -1)  # input move is invalid
-
-    def _initialize_grid(self, grid_size: int) -> list[list[int]]:
-        grid = [[0] * grid_size for _ in range(grid_size)]
-        return self._initialize_players(grid)
+            self.move_input.delete(0, "end")
+            try:
+                move = parse_move(player_input, self.grid_size)
+            except ValueError:  # input move is invalid
+                self.selected = (-1, -1)
+                self.grid_display = self.board.to_grid()
+                _ = self.error_message.config(text="Invalid move")
+                self._redraw_tkinter_grid()
+                return None
+
+        start_square, dest_square = decode_move(move)
+        self._select_piece(*divmod(start_square, self.grid_size))
+        self.make_move(*divmod(dest_square, self.grid_size))
 
     def _select_piece(self, selected_row: int, selected_col: int) -> None:
-        self.grid_display = deepcopy(self.grid)  # deep copy to avoid mutation
+        self.grid_display = self.board.to_grid()
 
-        if self.grid[selected_row][selected_col] != self.player_turn:
+        if self.board.get_square(selected_row, selected_col) != self.player_turn:
             self.selected = (-1, -1)
 
             if self.display:
@@ -176,147 +615,90 @@ class Halma:
 
         self.selected = (selected_row, selected_col)
         # mark possible moves
-        self._highlight_valid_moves_for_square(selected_row, selected_col)
-
-        # remove move from possible moves if it is not a forward move
-        highlighted_moves = (
-            (row_index, col_index)
-            for row_index, row in enumerate(self.grid_display)
-            for col_index, col in enumerate(row)
-            if col == 3
+        valid_moves = self._get_valid_destinations(
+            self.player_turn, selected_row * self.grid_size + selected_col
         )
+        for square in iter_squares(valid_moves):
+            self.grid_display[square // self.grid_size][square % self.grid_size] = 3
 
-        for new_row_index, new_col_index in highlighted_moves:
-            current_score = self._get_score_from_closest_camp(
-                self.player_turn, selected_row, selected_col
+    def _initialize_tkinter_grid(self):
+        import tkinter as tk
+
+        board_width = self.grid_size * SQUARE_SIZE
+        self.board_canvas = tk.Canvas(
+            self.display,
+            width=board_width,
+            height=board_width,
+            borderwidth=0,
+            highlightthickness=0,
+        )
+        self.board_canvas.grid(
+            row=1, column=1, rowspan=self.grid_size, columnspan=self.grid_size
+        )
+        _ = self.board_canvas.bind("<Button-1>", self._click_board)
+
+        self.square_items = []
+        for square in range(self.grid_size * self.grid_size):
+            row_index, col_index = divmod(square, self.grid_size)
+            left, top = col_index * SQUARE_SIZE, row_index * SQUARE_SIZE
+            highlight = self.board_canvas.create_rectangle(
+                left, top, left + SQUARE_SIZE, top + SQUARE_SIZE, outline="black"
             )
-            new_score = self._get_score_from_closest_camp(
-                self.player_turn, new_row_index, new_col_index
+            pawn = self.board_canvas.create_oval(
+                left + 6,
+                top + 6,
+                left + SQUARE_SIZE - 6,
+                top + SQUARE_SIZE - 6,
+                outline="",
+                width=2,
             )
-            if new_score < current_score:
-                self.grid_display[new_row_index][new_col_index] = 0
-
-    def _highlight_valid_moves_for_square(
-        self,
-        row_index: int,
-        col_index: int,
-        explored_squares: set[tuple[int, int]] | None = None,
-        jumped: bool = False,
-    ) -> None:
-        if not explored_squares:
-            explored_squares = set()
-        explored_squares.add((row_index, col_index))
-
-        for delta_row in range(-2, 3):
-            for delta_col in range(-2, 3):
-                if self._is_valid_move(
-                    row_index, col_index, delta_row, delta_col, jumped
-                ):
-                    move_row = row_index + delta_row
-                    move_col = col_index + delta_col
-                    self.grid_display[move_row][move_col] = 3  # 3 is highlight
-                    if (move_row, move_col) not in explored_squares and (
-                        abs(delta_col) == 2 or abs(delta_row) == 2
-                    ):
-                        self._highlight_valid_moves_for_square(
-                            move_row, move_col, explored_squares, True
-                        )
-
-    def _check_victory(self, player: int):
-        if self.headless:
-            return False
-
-        opponent = 2 if player == 1 else 1
-
-        piece_coordinates = [
-            (row_index, col_index)
-            for row_index, row in enumerate(self.grid)
-            for col_index, col in enumerate(row)
-            if col == player
-        ]
+            self.square_items.append((highlight, pawn))
+        self.drawn_squares = [None] * len(self.square_items)
 
-        return all(
-            self.camps[row_index][col_index] == opponent
-            for row_index, col_index in piece_coordinates
-        )
-
-    def _initialize_tkinter_grid(self):
-        for row_index in range(len(self.grid)):
-            row_pawns: list[tk.Canvas] = []
-            for col_index in range(len(self.grid)):
-                canvas = tk.Canvas(width=50, height=50, relief="solid", borderwidth=1)
-
-                row_pawns.append(canvas)
+        # keep the row and column labels lined up with the squares
+        for index in range(1, self.grid_size + 1):
+            _ = self.display.grid_rowconfigure(index, minsize=SQUARE_SIZE)
+            _ = self.display.grid_columnconfigure(index, minsize=SQUARE_SIZE)
 
-                _ = canvas.create_oval(
-                    8, 8, 50, 50, outline="black", fill="red", width=2
-                )
+    def _click_board(self, event: tk.Event) -> None:
+        row_index, col_index = event.y // SQUARE_SIZE, event.x // SQUARE_SIZE
+        if row_index < self.grid_size and col_index < self.grid_size:
+            self._click_square(row_index, col_index)
 
-                _ = canvas.create_rectangle(
-                    8, 8, 50, 50, outline="black", fill="green", width=2
-                )
-
-                canvas.grid(
-                    row=row_index + 1,
-                    column=col_index + 1,
-                    padx=0,
-                    pady=0,
-                    sticky="nsew",
-                )
-                _ = canvas.bind(
-                    "<Button-1>",
-                    lambda _, row=row_index, col=col_index: self.make_move(row, col),
-                )
-            if self.display:
-                _ = self.display.grid_rowconfigure(row_index + 1, weight=0)
-            self.pawns.append(row_pawns)
+    def _click_square(self, row_index: int, col_index: int) -> None:
+        if self.bot_search is None:  # no clicks while the bot is thinking
+            self.make_move(row_index, col_index)
 
     def _redraw_tkinter_grid(self):
         if self.headless:
             return
 
-        for row_index, row in enumerate(self.pawns):
-            for col_index, pawn in enumerate(row):
-                square_state = self.grid_display[row_index][col_index]
-                outline, fill = self.grid_options[square_state]
-                if (row_index, col_index) == self.selected:
-                    outline, fill = self.grid_options[4]  # 4 is highlighted piece
-                    _ = pawn.itemconfig(2, outline="", fill="")
-                    _ = pawn.itemconfig(1, outline=outline, fill=fill)
-                elif square_state == 3:  # potential move
-                    _ = pawn.itemconfig(2, outline=outline, fill=fill)
-                else:
-                    _ = pawn.itemconfig(2, outline="", fill="")
-                    _ = pawn.itemconfig(1, outline=outline, fill=fill)
-
-        outline, fill = self.grid_options[5]  # 5 is previous position colors
-        if self.previous_square:
-            previous_row, previous_col = self.previous_square
-            _ = self.pawns[previous_row][previous_col].itemconfig(
-                1, outline=outline, fill=fill
-            )
-
-    def _initialize_players(self, grid: list[list[int]]):
-        for row_index in range(FIRST_ROW_PAWN_COUNT):
-            player_1_row = grid[row_index]
-            player_2_row = grid[-row_index - 1]
-            for col_index in range(FIRST_ROW_PAWN_COUNT - row_index):
-                player_1_row[col_index] = 1
-                player_2_row[-col_index - 1] = 2
-
-        return grid
-
-    def _initialize_camps(self, game_grid: list[list[int]]):
-        grid = deepcopy(game_grid)
-
-        for row_index in range(FIRST_ROW_PAWN_COUNT + 1):
-            player_1_row = grid[row_index]
-            player_2_row = grid[-row_index - 1]
-            for col_index in range(FIRST_ROW_PAWN_COUNT + 1 - row_index):
-                player_1_row[col_index] = 1
-                player_2_row[-col_index - 1] = 2
+        for square, (highlight, pawn) in enumerate(self.square_items):
+            appearance = self._get_square_appearance(*divmod(square, self.grid_size))
+            if appearance == self.drawn_squares[square]:
+                continue
+            highlight_fill, pawn_outline, pawn_fill = appearance
+            _ = self.board_canvas.itemconfig(highlight, fill=highlight_fill)
+            _ = self.board_canvas.itemconfig(pawn, outline=pawn_outline, fill=pawn_fill)
+            self.drawn_squares[square] = appearance
+
+    def _get_square_appearance(
+        self, row_index: int, col_index: int
+    ) -> tuple[str, str, str]:
+        """Returns the (highlight fill, pawn outline, pawn fill) of a square"""
+        square_state = self.grid_display[row_index][col_index]
+        highlight_fill = ""
+        if (row_index, col_index) == self.selected:
+            outline, fill = self.grid_options[4]  # 4 is highlighted piece
+        elif square_state == 3:  # potential move
+            highlight_fill = self.grid_options[3][1]
+            outline, fill = self.grid_options[0]
+        else:
+            outline, fill = self.grid_options[square_state]
 
-        return tuple((tuple(row) for row in grid))
+        if (row_index, col_index) == self.previous_square:
+            outline, fill = self.grid_options[5]  # 5 is previous position colors
+        return highlight_fill, outline, fill
 
     def _swap_turns(self):
         if self.display:
@@ -337,7 +719,7 @@ class Halma:
         ]
 
         self.turn_number += 1
-        self._set_player_scores()
+        self._update_score_display()
         if self.display:
             _ = self.error_message.config(text="")
             self._redraw_tkinter_grid()
@@ -345,71 +727,101 @@ class Halma:
             _ = self.timer_display.config(text=f"Time: {self.timeout}")
 
         if self.player_turn == 2 and not self.headless:
-            bot = HalmaBot2000(
-                master_game=self, thinking_time=self.timeout, event_loop=self.display
-            )
-            robo_move = bot.determine_best_move()
-            self._process_move_input(robo_move=robo_move)
-
-    def _is_valid_move(
-        self,
-        current_row: int,
-        current_col: int,
-        delta_row: int,
-        delta_col: int,
-        jumped: bool,
-    ) -> bool:
-        new_row = current_row + delta_row
-        new_col = current_col + delta_col
-
-        if not self._is_in_bounds(new_row, new_col):  # move out of bounds
-            return False
-
-        if jumped:  # previous move was a jump
-            return self._is_valid_jump(current_row, current_col, delta_row, delta_col)
-
-        elif abs(delta_col) < 2 and abs(delta_row) < 2:  # move is single square
-            return self.grid[new_row][new_col] == 0  # true if no piece present
-
+            self._start_bot_search()
+
+    def _start_bot_search(self) -> None:
+        """Runs the bot's search in a worker thread so the window stays responsive
+
+        The thread posts progress and the chosen move to a queue that
+        _poll_bot_search reads from the tkinter event loop. If the bot has
+        been pondering the move the human just made, that search carries on.
+        """
+        bot = self.bot
+        if bot is not None and bot.ponder_key is not None:
+            if bot.ponder_key == self.position_key:
+                bot.ponder_hit()
+            else:
+                self._stop_pondering()
+                bot.set_position(self)
+                self._run_search_thread(bot)
+        elif bot is None:
+            bot = self.bot = create_bot(self, self.timeout)
+            self._run_search_thread(bot)
         else:
-            return self._is_valid_jump(current_row, current_col, delta_row, delta_col)
+            bot.set_position(self)
+            self._run_search_thread(bot)
 
-    def _is_valid_jump(
-        self, current_row: int, current_col: int, delta_row: int, delta_col: int
-    ):
-        new_row = current_row + delta_row
-        new_col = current_col + delta_col
-
-        adjacent_row = current_row + self._decrease_magnitude(delta_row)
-        adjacent_col = current_col + self._decrease_magnitude(delta_col)
-
-        is_orthag_or_diag = (
-            abs(delta_col) == 2
-            and abs(delta_row) == 2
-            or abs(delta_col) == 2
-            and abs(delta_row) == 0
-            or abs(delta_col) == 0
-            and abs(delta_row) == 2
+        self.bot_search = bot
+        _ = self.search_status_display.config(text="Thinking")
+        self.after_search_poll = self.display.after(
+            SEARCH_POLL_INTERVAL, self._poll_bot_search
         )
 
-        adjactent_piece_precent = self.grid[adjacent_row][adjacent_col] != 0
-
-        no_piece_at_destination = (
-            self.grid[new_row][new_col] == 0
-        )  # no piece on destination
+    def _run_search_thread(self, bot: SearchBot) -> None:
+        # a queue per search, so a cancelled search can't post into the next one
+        messages: queue.Queue = queue.Queue()
+        bot.stats_callback = lambda record: messages.put(("progress", record))
+
+        def run_search() -> None:
+            messages.put(("move", bot.determine_best_move()))
+
+        self.bot_search_messages = messages
+        self.bot_search_depth = 0
+        self.bot_thread = threading.Thread(target=run_search, daemon=True)
+        self.bot_thread.start()
+
+    def _start_pondering(self) -> None:
+        """Searches the bot's answer to the human's expected move in the background"""
+        if self.bot is not None and self.bot.start_pondering(self):
+            self._run_search_thread(self.bot)
+
+    def _stop_pondering(self) -> None:
+        self.bot._set_timeout()
+        self.bot_thread.join()  # returns within a node or two
+        self.bot.ponder_key = None
+
+    def _poll_bot_search(self) -> None:
+        """Shows the bot's progress, plays its move once the search is done"""
+        bot = self.bot_search
+        if bot is None:
+            return None
 
-        return is_orthag_or_diag and adjactent_piece_precent and no_piece_at_destination
+        while True:
+            try:
+                message, value = self.bot_search_messages.get_nowait()
+            except queue.Empty:
+                break
+            if message == "move":
+                self.bot_search = None
+                _ = self.search_status_display.config(text="")
+                self._play_bot_move(value)
+                return None
+            if value["event"] == "iteration":
+                self.bot_search_depth = value["depth"]
+
+        # nodes_searched is read while the worker writes it, it is only shown
+        progress = f"{bot.nodes_searched} nodes"
+        if self.bot_search_depth:
+            progress = f"depth {self.bot_search_depth} done, {progress}"
+        _ = self.search_status_display.config(text=f"Thinking: {progress}")
+        self.after_search_poll = self.display.after(
+            SEARCH_POLL_INTERVAL, self._poll_bot_search
+        )
 
-    def _is_in_bounds(self, row: int, col: int) -> bool:
-        grid_size = len(self.grid)
-        return row >= 0 and row < grid_size and col >= 0 and col < grid_size
+    def _play_bot_move(self, move: int) -> None:
+        """Plays the bot's move, -1 if it had no legal moves"""
+        if move < 0:
+            # stuck, it would only lose on time
+            self._end_game(2 if self.player_turn == 1 else 1)
+            return None
+        self._process_move_input(robo_move=move)
+        if self.winner is None:
+            self._start_pondering()
 
-    def _decrease_magnitude(self, number: int) -> int:
-        if number > 0:
-            return number - 1
-        elif number < 0:
-            return number + 1
-        return number  # number is already 0
+    def _stop_bot_search(self) -> None:
+        """Makes a running bot search finish with the best move found so far"""
+        if self.bot_search is not None:
+            self.bot_search._set_timeout()
 
     def _decrement_timer(self):
         self.time_remaining -= 1
@@ -421,10 +833,7 @@ class Halma:
             _ = self.timer_display.config(text=f"Time: {self.time_remaining}")
             self.after_timer_decrement = self.display.after(1000, self._decrement_timer)
 
-    def _set_player_scores(self):
-        self.player_1_score = self._calculate_score(1)
-        self.player_2_score = self._calculate_score(2)
-
+    def _update_score_display(self):
         if self.display:
             _ = self.player_1_score_display.config(
                 text=f"P1 Score: {self.player_1_score:.2f}"
@@ -433,45 +842,22 @@ class Halma:
                 text=f"P2 Score: {self.player_2_score:.2f}"
             )
 
-    def _calculate_score(self, player: int):
-        return sum(
-            self._get_score_from_closest_camp(player, row_index, col_index)
-            for row_index, row in enumerate(self.grid)
-            for col_index, col in enumerate(row)
-            if col == player
-        )
-
-    def _get_score_from_closest_camp(
-        self, player: int, row_index: int, col_index: int
-    ) -> float:
-        opponent = 2 if player == 1 else 1
-
-        opponent_camp_coordinates = (
-            (camp_row_index, camp_col_index)
-            for camp_row_index, camp_row in enumerate(self.camps)
-            for camp_col_index, camp_col in enumerate(camp_row)
-            if camp_col == opponent
-        )
-
-        closest_euclidean_distance = min(
-            self._get_euclidean_distance(
-                row_index, col_index, camp_row_index, camp_col_index
-            )
-            for camp_row_index, camp_col_index in opponent_camp_coordinates
-        )
-
-        if closest_euclidean_distance == 0:
-            return 1.0
-
-        return 1 / (closest_euclidean_distance + 1)
-
-    def _get_euclidean_distance(self, x1: int, y1: int, x2: int, y2: int) -> float:
-        return (((x1 - x2) ** 2) + ((y1 - y2) ** 2)) ** (1 / 2)
-
     def _end_game(self, winning_player: int, timeout: bool = False):
+        self.winner = winning_player
+        if self.game_record is not None:
+            self.game_record.finish_game(winning_player)
+        if self.bot_search is not None:
+            # the search thread stops soon, its move is never read
+            self.bot_search._set_timeout()
+            self.bot_search = None
+            self.display.after_cancel(self.after_search_poll)
+        elif self.bot is not None and self.bot.ponder_key is not None:
+            self.bot._set_timeout()
+
         # remake display with endscreen info
         if self.headless:
             return None
+        import tkinter as tk
 
         for widget in self.display.winfo_children():
             widget.destroy()
@@ -481,7 +867,7 @@ class Halma:
         winner_display = tk.Label(
             self.display, text=f"{timeout_notification}Player {winning_player} wins!"
         )
-        winner_display.grid(row=0, column=0, columnspan=len(self.grid) + 1)
+        winner_display.grid(row=0, column=0, columnspan=self.grid_size + 1)
 
         player_1_score_display = tk.Label(
             self.display, text=f"Player 1 score: {self.player_1_score:.2f}"
@@ -490,187 +876,1622 @@ class Halma:
             self.display, text=f"Player 2 score: {self.player_2_score:.2f}"
         )
         player_1_score_display.grid(
-            row=len(self.grid) // 2, column=0, columnspan=len(self.grid) // 2
+            row=self.grid_size // 2, column=0, columnspan=self.grid_size // 2
         )
         player_2_score_display.grid(
-            row=len(self.grid) // 2,
-            column=len(self.grid) // 2,
-            columnspan=len(self.grid) // 2,
+            row=self.grid_size // 2,
+            column=self.grid_size // 2,
+            columnspan=self.grid_size // 2,
         )
 
         exit_button = tk.Button(
             text="Exit", bg="red", fg="black", command=self.display.quit
         )
 
-        exit_button.grid(row=len(self.grid), column=len(self.grid), columnspan=2)
+        exit_button.grid(row=self.grid_size, column=self.grid_size, columnspan=2)
+
 
+class SearchBot(ABC):
+    """What HalmaBot2000 and MonteCarloBot share: the board they search, the
+    time limit and stats reporting
 
-class HalmaBot2000:
-    def __init__(self, master_game: Halma, thinking_time: int, event_loop: tk.Tk):
-        self.original_board: list[list[int]] = deepcopy(master_game.grid)
-        self.game: Halma = Halma(
-            len(self.original_board),
-            thinking_time * 999999,  # just a big number so unexpected swaps dont happen
-            "red",
-            self.original_board,
-            True,
+    Subclasses implement search().
+    """
+
+    def __init__(
+        self,
+        master_game: GameState,
+        thinking_time: int,
+        worker_count: int | None = None,
+    ):
+        # searched on a copy, the master game's board is never touched
+        self.game: GameState = GameState(
+            master_game.grid_size, master_game.board.copy()
         )
         # -100 ms to leave time for post-processing
         self.thinking_time: float = float(thinking_time) - 0.1
+        # thinking time of one move, thinking_time is stretched while pondering
+        self.move_thinking_time: float = self.thinking_time
         self.timeout_set: bool = False
-        self.game._swap_turns()
+        # position key after the opponent's expected move while pondering it
+        self.ponder_key: int | None = None
+        # the bot moves for whoever's turn it is in the master game
+        self.player: int = master_game.player_turn
+        self.opponent: int = 2 if self.player == 1 else 1
+        self.game.player_turn = self.player
+
+        # search in worker processes, see the subclass's _search_parallel
+        self.use_parallel_search: bool = False
+        self.worker_count: int = worker_count or os.cpu_count() or 1
+        # in a worker, set by the parent to stop the search, see _run_workers
+        self.stop_event: multiprocessing.synchronize.Event | None = None
+        # in the parent, the stop flag of the workers running now
+        self.worker_stop_event: multiprocessing.synchronize.Event | None = None
+
+        # print a summary of each search, off so games and tools stay quiet
+        self.verbose: bool = False
+        # every finished iteration and search is sent as a json record to these
+        self.stats_output: TextIO | None = None
+        self.stats_callback: Callable[[dict], None] | None = None
+        self.stats: SearchStats = SearchStats(self.game.grid_size, self.player)
+        self.nodes_searched: int = 0
+        self.boards_analyzed: int = 0
+        self.time_manager: TimeManager = TimeManager(self.thinking_time)
+
+    def determine_best_move(self) -> int:
+        """Returns the best move found through searching"""
+        move, _ = self.search()
+        return move
+
+    @abstractmethod
+    def search(self) -> tuple[int, SearchStats]:
+        """Returns the best move found through searching and how it was found
+
+        The move is -1 when the player has no legal moves.
+        """
+
+    def set_position(self, master_game: GameState) -> None:
+        """Moves the bot's board to the master game's position
+
+        What the bot kept from earlier searches, a transposition table or a
+        tree, carries over to positions that come up again.
+        """
+        self.game.set_board(master_game.board.copy())
+        self.game.player_turn = master_game.player_turn
+        self.thinking_time = self.move_thinking_time
+        self.timeout_set = False
+        self.ponder_key = None
+
+    def start_pondering(self, master_game: GameState) -> bool:
+        """Sets up a search of the opponent's expected move, False if the bot
+        doesn't ponder"""
+        return False
+
+    def _report_stats(self, record: dict) -> None:
+        """Sends a stats record to the json lines output and the callback"""
+        if self.stats_output is not None:
+            self.stats_output.write(json.dumps(record, allow_nan=False) + "\n")
+            self.stats_output.flush()
+        if self.stats_callback is not None:
+            self.stats_callback(record)
+
+    def _set_timeout(self):
+        """Stops the search, it returns the best move found so far"""
+        self.timeout_set = True
+        if self.worker_stop_event is not None:
+            self.worker_stop_event.set()
+
+    def _run_workers(
+        self,
+        worker: Callable[..., dict],
+        worker_arguments: list[tuple],
+        shared_root_alphas=None,
+    ) -> list[dict]:
+        """Calls worker once per argument tuple in worker processes, returns
+        their reports in order
+
+        The workers share a stop flag. It is set by _set_timeout, or here once
+        the time manager's deadline passes, which ponder_hit can move.
+        """
+        context = multiprocessing.get_context(WORKER_START_METHOD)
+        stop_event = self.worker_stop_event = context.Event()
+        if self.timeout_set:  # stopped before the workers were made
+            stop_event.set()
+        try:
+            with ProcessPoolExecutor(
+                len(worker_arguments),
+                mp_context=context,
+                initializer=_initialize_search_worker,
+                initargs=(stop_event, shared_root_alphas),
+            ) as pool:
+                futures = [
+                    pool.submit(worker, *arguments) for arguments in worker_arguments
+                ]
+                pending = set(futures)
+                while pending:
+                    _, pending = wait(
+                        pending, WORKER_POLL_INTERVAL, return_when=FIRST_COMPLETED
+                    )
+                    if time.monotonic() >= self.time_manager.deadline:
+                        stop_event.set()
+                return [future.result() for future in futures]
+        finally:
+            self.worker_stop_event = None
+
+    def _get_worker_deadline(self) -> float:
+        """Returns the deadline the workers are given, never unlimited"""
+        return min(self.time_manager.deadline, time.monotonic() + MAX_WORKER_SECONDS)
+
+
+class HalmaBot2000(SearchBot):
+    def __init__(
+        self,
+        master_game: GameState,
+        thinking_time: int,
+        event_loop: tk.Tk | None,
+        transposition_table_mb: float = 16,
+        worker_count: int | None = None,
+    ):
+        super().__init__(master_game, thinking_time, worker_count)
+        # stop deepening after this depth even if there is time left
+        self.max_depth: int | None = None
 
         self.use_alpha_beta_pruning: bool = True
+        # negamax principal variation search with aspiration windows at the
+        # root instead of _minimax_search, needs use_alpha_beta_pruning
+        self.use_principal_variation_search: bool = False
+        self.use_transposition_table: bool = True
+        self.transposition_table_mb: float = transposition_table_mb
+        self.transposition_table: TranspositionTable = TranspositionTable(
+            transposition_table_mb
+        )
+        self.use_move_ordering: bool = True
+        # score the children of the last ply before the leaves all at once
+        self.use_batch_evaluation: bool = True
+        # play book moves without searching, see OpeningBook
+        self.use_opening_book: bool = True
+        self.opening_book: OpeningBook | None = load_opening_book()
+        # best line found by the last finished iteration, searched first by the next
+        self.principal_variation: list[int] = []
+        # best line below each ply of the current iteration
+        self.ply_variations: list[list[int]] = []
+        self.following_principal_variation: bool = False
+        # up to two recent cutoff moves per ply
+        self.killer_moves: list[list[int]] = []
+        # cutoff count weighted by remaining depth, indexed by packed move
+        self.history_scores: list[int] = [0] * (1 << 16)
+
+        # use_parallel_search splits the root moves over the workers, see
+        # _search_root_moves
+        # root moves to search instead of every move, set in worker processes
+        self.root_moves: list[int] | None = None
+        # best root score found so far per depth, shared between workers
+        self.shared_root_alphas = None
+        # best (move, score) at the root, only counting exact scores
+        self.root_best: tuple[int, float] | None = None
+        # root_best of every finished iteration, by depth
+        self.completed_iterations: dict[int, tuple[int, float] | None] = {}
+        self.worker_reports: list[dict] = []
 
-        self.boards_analyzed: int = 0
         self.pruned_at_depth: dict[int, int] = dict()
-        self.start_time: float = 0.0
-        self.elapsed_time: float = 0.0
+        # root score of the last finished iteration
+        self.root_score: float | None = None
+
+    def search(self) -> tuple[int, SearchStats]:
+        """Returns the best move found through searching and how it was found
+
+        The move is -1 when the player has no legal moves.
+        """
+        if self.use_opening_book and self.opening_book is not None:
+            move = self.opening_book.lookup(self.game.position_key)
+            # a key collision could name a move that isn't legal here
+            if move is not None and move in self._get_all_possible_moves(self.player):
+                self.stats = SearchStats(
+                    self.game.grid_size,
+                    self.player,
+                    move=move,
+                    principal_variation=[move],
+                    book_move=True,
+                )
+                self.timeout_set = False
+                self._finish_search(self.stats)
+                return move, self.stats
+
+        if self.use_parallel_search and self.worker_count > 1:
+            return self._search_parallel()
 
-    def determine_best_move(self) -> str:
-        """Returns the best move found through searching"""
         # Reset statistics
+        self.completed_iterations = {}
+        self.nodes_searched = 0
         self.boards_analyzed = 0
         self.pruned_at_depth = {}
-        self.start_time = time.time()
-        self.elapsed_time = self.start_time
-
-        best_move = ""
+        self.time_manager = TimeManager(self.thinking_time, stop_event=self.stop_event)
+        self.principal_variation = []
+        self.killer_moves = []
+        self.history_scores = [0] * (1 << 16)
+        self.stats = SearchStats(self.game.grid_size, self.player)
+        table = self.transposition_table
+        table_counts = (table.probes, table.hits, table.collisions, table.stores)
+
+        best_move = -1
         iteration_depth = 0
-
-        while self.elapsed_time < self.start_time + self.thinking_time:
-            board_backup = deepcopy(self.game.grid)
-            result = self._minimax_search(max_depth=iteration_depth)
-            self.game.grid = board_backup
-            if result:
+        iteration_seconds: list[float] = []
+
+        # depth 0 only generates moves and always runs, so there is a move to
+        # give even when the search is stopped before it starts
+        while iteration_depth == 0 or not self.timeout_set:
+            if self.max_depth is not None and iteration_depth > self.max_depth:
+                break
+            if iteration_depth > 0 and not self.time_manager.can_finish_iteration(
+                iteration_seconds
+            ):
+                break
+            self.ply_variations = [[] for _ in range(iteration_depth + 1)]
+            while len(self.killer_moves) <= iteration_depth:
+                self.killer_moves.append([])
+            self.following_principal_variation = True
+            self.root_best = None
+            iteration_start_time = self.time_manager.elapsed()
+            iteration_nodes = self.nodes_searched
+            iteration_leaves = self.boards_analyzed
+            if self.use_principal_variation_search and self.use_alpha_beta_pruning:
+                result = self._aspiration_search(iteration_depth)
+            else:
+                result = self._minimax_search(max_depth=iteration_depth)
+
+            if result is None:
+                # out of time, the best root move searched in full still counts
+                # as it beat the previous best move at the deeper depth
+                if iteration_depth == 0 or self.root_best is None:
+                    break
+                best_move, self.root_score = self.root_best
+                variation = self.ply_variations[0]
+                self.principal_variation = (
+                    variation if variation[:1] == [best_move] else [best_move]
+                )
+            else:
                 best_move = result
-                print(
-                    f"Total boards analyzed: {self.boards_analyzed} in {(self.elapsed_time - self.start_time):.4f} seconds"
+                self.principal_variation = self.ply_variations[0]
+                if iteration_depth > 0:
+                    self.completed_iterations[iteration_depth] = self.root_best
+
+            if iteration_depth > 0:
+                iteration_seconds.append(
+                    self.time_manager.elapsed() - iteration_start_time
+                )
+                iteration = IterationStats(
+                    iteration_depth,
+                    self.nodes_searched - iteration_nodes,
+                    self.boards_analyzed - iteration_leaves,
+                    [
+                        self.pruned_at_depth.get(ply, 0)
+                        for ply in range(iteration_depth)
+                    ],
+                    iteration_seconds[-1],
+                    best_move,
+                    self.root_score,
+                    self.principal_variation,
+                    completed=result is not None,
+                )
+                self.stats.iterations.append(iteration)
+                self._report_stats(
+                    {"event": "iteration", **iteration.to_dict(self.game.grid_size)}
                 )
-                for depth, count in sorted(self.pruned_at_depth.items()):
-                    print(f"  Depth {depth}: {count} branches pruned")
-                self.pruned_at_depth.clear()
-                iteration_depth += 1
-                print()
+            self.pruned_at_depth.clear()
+            if result is None or result < 0:
+                break  # out of time, or no legal moves to search
+            iteration_depth += 1
+
+        stats = self.stats
+        stats.move = best_move
+        stats.depth = max(self.completed_iterations, default=0)
+        stats.nodes = self.nodes_searched
+        stats.leaf_evaluations = self.boards_analyzed
+        stats.seconds = self.time_manager.elapsed()
+        if stats.iterations:
+            last_iteration = stats.iterations[-1]
+            stats.score = last_iteration.score
+            stats.principal_variation = last_iteration.principal_variation
+            stats.cutoffs_by_ply = [
+                sum(
+                    iteration.cutoffs_by_ply[ply]
+                    for iteration in stats.iterations
+                    if ply < iteration.depth
+                )
+                for ply in range(last_iteration.depth)
+            ]
+        if self.use_transposition_table:
+            (
+                stats.table_probes,
+                stats.table_hits,
+                stats.table_collisions,
+                stats.table_stores,
+            ) = (
+                table.probes - table_counts[0],
+                table.hits - table_counts[1],
+                table.collisions - table_counts[2],
+                table.stores - table_counts[3],
+            )
 
-        print(f"making move {best_move}")
-        return best_move
+        self.timeout_set = False  # ready for the next search
+        self._finish_search(stats)
+        return best_move, stats
+
+    def start_pondering(self, master_game: GameState) -> bool:
+        """Sets up a search of the position after the opponent's expected move
+
+        The expected move is the reply in the last search's principal
+        variation. Returns False when there is none. Run search() to ponder,
+        then call ponder_hit() if the opponent plays the expected move, or
+        _set_timeout() if they don't.
+        """
+        variation = self.stats.principal_variation
+        self.set_position(master_game)
+        if len(variation) < 2 or self.game.player_turn != self.opponent:
+            return False
+        expected_move = variation[1]
+        if expected_move not in self.game.get_legal_moves(self.opponent):
+            return False
+
+        self.game.apply_move(expected_move)
+        self.game.move_stack.clear()
+        self.ponder_key = self.game.position_key
+        self.thinking_time = math.inf  # until ponder_hit or _set_timeout
+        return True
+
+    def ponder_hit(self) -> None:
+        """Turns pondering into the real search, a full move's thinking time from now"""
+        self.ponder_key = None
+        # either the running search's budget, or the one it will start with
+        self.thinking_time = self.move_thinking_time
+        self.time_manager.budget = self.time_manager.elapsed() + self.move_thinking_time
+
+    def _search_parallel(self) -> tuple[int, SearchStats]:
+        """Returns the best move found by searching root moves in worker processes
+
+        Root moves are dealt round robin to the workers, which each run their
+        own iterative deepening until the thinking time is up. A root score
+        found by one worker is shared as alpha with the others. The answer is
+        the best exact score at the deepest depth every worker finished.
+        """
+        self.time_manager = TimeManager(self.thinking_time)
+        deadline = self._get_worker_deadline()
+        self.killer_moves = [[]]
+        moves = self._order_moves(
+            self._get_all_possible_moves(self.player), self.player, 0, None
+        )
+        if not moves:
+            self.stats = SearchStats(self.game.grid_size, self.player)
+            self._finish_search(self.stats)
+            return -1, self.stats
+        worker_count = min(self.worker_count, len(moves))
+        shared_root_alphas = multiprocessing.get_context(WORKER_START_METHOD).Array(
+            "d", [-math.inf] * MAX_PARALLEL_DEPTH
+        )
+
+        settings = {
+            setting: getattr(self, setting) for setting in PARALLEL_SEARCH_SETTINGS
+        }
+        grid = self.game.grid
+        self.worker_reports = self._run_workers(
+            _search_root_moves,
+            [
+                (
+                    grid,
+                    moves[worker_index::worker_count],
+                    self.player,
+                    deadline,
+                    self.transposition_table_mb,
+                    settings,
+                )
+                for worker_index in range(worker_count)
+            ],
+            shared_root_alphas,
+        )
+        self.boards_analyzed = sum(
+            report["leaf_evaluations"] for report in self.worker_reports
+        )
+
+        common_depth = min(report["depth"] for report in self.worker_reports)
+        candidates = [
+            report["iterations"][common_depth]
+            for report in self.worker_reports
+            if report["iterations"].get(common_depth)
+        ]
+        best_move = moves[0]  # no depth finished by every worker
+        best_score = None
+        if candidates:
+            best_move, best_score = max(candidates, key=lambda candidate: candidate[1])
+
+        stats = SearchStats(
+            self.game.grid_size,
+            self.player,
+            move=best_move,
+            score=best_score,
+            depth=common_depth,
+            nodes=sum(report["nodes"] for report in self.worker_reports),
+            leaf_evaluations=self.boards_analyzed,
+            seconds=self.time_manager.elapsed(),
+            principal_variation=[best_move],
+            workers=[
+                {key: report[key] for key in ("nodes", "leaf_evaluations", "depth")}
+                for report in self.worker_reports
+            ],
+        )
+        if self.use_transposition_table:
+            (
+                stats.table_probes,
+                stats.table_hits,
+                stats.table_collisions,
+                stats.table_stores,
+            ) = (
+                sum(report["table"][index] for report in self.worker_reports)
+                for index in range(4)
+            )
+
+        self.stats = stats
+        self.timeout_set = False
+        self._finish_search(stats)
+        return best_move, stats
+
+    def _finish_search(self, stats: SearchStats) -> None:
+        self._report_stats({"event": "search", **stats.to_dict()})
+        if not self.verbose:
+            return
+
+        for iteration in stats.iterations:
+            print(
+                f"Depth {iteration.depth}: {iteration.leaf_evaluations} boards analyzed in {iteration.seconds:.4f} seconds, best move utility {iteration.score}"
+            )
+            for ply, count in enumerate(iteration.cutoffs_by_ply):
+                if count:
+                    print(f"  Depth {ply}: {count} branches pruned")
+        for worker_index, worker in enumerate(stats.workers):
+            print(
+                f"Worker {worker_index}: {worker['leaf_evaluations']} boards analyzed, depth {worker['depth']} reached"
+            )
+        if stats.table_probes is not None:
+            print(
+                f"Transposition table: {stats.table_hits}/{stats.table_probes} hits, {stats.table_collisions} collisions"
+            )
+        print(
+            f"Total boards analyzed: {stats.leaf_evaluations} in {stats.seconds:.4f} seconds, depth {stats.depth} reached"
+        )
+        if stats.move >= 0:
+            source = " from the opening book" if stats.book_move else ""
+            print(f"making move {format_move(stats.move, self.game.grid_size)}{source}")
 
     def _minimax_search(
         self, max_depth: int, current_depth: int = 0, alpha=-math.inf, beta=math.inf
-    ) -> str | float:
-        """Searches for best move using minimax algorithm"""
-        if max_depth == 0:
-            return self._get_all_possible_moves(2)[0]  # return first move seen
+    ) -> int | float | None:
+        """Searches for best move using minimax algorithm
 
-        if self.elapsed_time > self.start_time + self.thinking_time:
-            return ""
+        Returns the best packed move at the root, the board score below it and
+        None once the thinking time has run out.
+        """
+        if max_depth == 0:
+            # return first move seen, -1 when there are no moves
+            moves = self._get_all_possible_moves(self.player)
+            return moves[0] if moves else -1
 
+        if self.timeout_set:
+            return None
+        self.nodes_searched += 1
+        time_manager = self.time_manager
+        if self.nodes_searched >= time_manager.next_check and time_manager.check(
+            self.nodes_searched
+        ):
+            self._set_timeout()
+            return None
         ai_turn = (current_depth % 2) == 0
-        self.game._set_player_scores()
 
         if current_depth == max_depth:
             self.boards_analyzed += 1
             quality = self._determine_board_quality()
             return quality
 
-        best_move = ""
+        self.ply_variations[current_depth] = []
+
+        # a previous search of this position can answer or narrow this one
+        table_move = None
+        if self.use_transposition_table:
+            entry = self.transposition_table.probe(self.game.position_key)
+            if entry is not None:
+                _, entry_depth, bound, entry_score, table_move = entry
+                if entry_depth >= max_depth - current_depth and current_depth > 0:
+                    if bound == TranspositionTable.EXACT:
+                        return entry_score
+                    if bound == TranspositionTable.LOWER_BOUND:
+                        alpha = max(alpha, entry_score)
+                    else:
+                        beta = min(beta, entry_score)
+                    if alpha > beta:
+                        return entry_score
+        window_alpha, window_beta = alpha, beta
+
+        best_move: int | None = None
         best_score = -math.inf if ai_turn else math.inf
 
-        starting_board = deepcopy(self.game.grid)
-        starting_turn = self.game.player_turn
+        player = self.player if ai_turn else self.opponent
+        if current_depth == 0 and self.root_moves is not None:
+            moves = self.root_moves.copy()
+        else:
+            moves = self._get_all_possible_moves(player)
+
+        if self.use_batch_evaluation and current_depth == max_depth - 1 > 0:
+            best_move, best_score = self._search_frontier(
+                moves, player, current_depth, max_depth, alpha, beta
+            )
+            moves = []  # every child is already scored
+        on_principal_variation = self.following_principal_variation
+        if self.use_move_ordering:
+            moves = self._order_moves(moves, player, current_depth, table_move)
+        elif table_move in moves:  # best move of the previous search goes first
+            moves.remove(table_move)
+            moves.insert(0, table_move)
 
-        moves: list[str] = self._get_all_possible_moves(2 if ai_turn else 1)
+        if current_depth == 0:
+            self.root_best = None
 
         for move in moves:
-            self.game.grid = deepcopy(starting_board)
-            self.game._process_move_input(move)
+            if current_depth == 0:
+                if self.shared_root_alphas is not None:
+                    # another worker may already have found a better root move
+                    alpha = max(alpha, self.shared_root_alphas[max_depth])
+                root_alpha = alpha
+            # only the first child of a principal variation node continues it
+            self.following_principal_variation = (
+                on_principal_variation
+                and current_depth < len(self.principal_variation)
+                and move == self.principal_variation[current_depth]
+            )
+            self.game.apply_move(move)
             result_score = self._minimax_search(
                 max_depth, current_depth + 1, alpha=alpha, beta=beta
             )
+            self.game.undo_move()
 
-            # print( best_score, result_score, max_depth, current_depth, self.game.player_turn, ai_turn,)
+            if result_score is None:
+                return None
 
-            if result_score == "":
-                self.game.grid = deepcopy(starting_board)
-                self.game.player_turn = starting_turn
-                return ""
+            if current_depth == 0 and result_score > root_alpha:
+                self._record_root_score(move, result_score, max_depth)
 
             if ai_turn:
-                if result_score > best_score:
+                if result_score > best_score or best_move is None:
                     best_score = result_score
                     best_move = move
+                    self._update_variation(current_depth, move)
                 if self.use_alpha_beta_pruning:
                     alpha = max(alpha, result_score)
                     if alpha > beta:
-                        if current_depth not in self.pruned_at_depth:
-                            self.pruned_at_depth[current_depth] = 0
-                        self.pruned_at_depth[current_depth] += 1
+                        self._record_cutoff(move, current_depth, max_depth)
                         best_score = result_score
                         break
             else:
-                if result_score < best_score:
+                if result_score < best_score or best_move is None:
                     best_score = result_score
+                    best_move = move
+                    self._update_variation(current_depth, move)
                 if self.use_alpha_beta_pruning:
                     beta = min(beta, result_score)
                     if beta < alpha:
-                        if current_depth not in self.pruned_at_depth:
-                            self.pruned_at_depth[current_depth] = 0
-                        self.pruned_at_depth[current_depth] += 1
+                        self._record_cutoff(move, current_depth, max_depth)
                         best_score = result_score
                         break
 
-            self.game.grid = deepcopy(starting_board)
-            self.game.player_turn = starting_turn
-
-        self.game.grid = deepcopy(starting_board)
-        self.game.player_turn = starting_turn
+        # the root of a search over some of the root moves has no true score
+        if self.use_transposition_table and (
+            current_depth > 0 or self.root_moves is None
+        ):
+            if best_score < window_alpha:
+                bound = TranspositionTable.UPPER_BOUND
+            elif best_score > window_beta:
+                bound = TranspositionTable.LOWER_BOUND
+            else:
+                bound = TranspositionTable.EXACT
+            self.transposition_table.store(
+                self.game.position_key,
+                max_depth - current_depth,
+                bound,
+                best_score,
+                best_move,
+            )
 
-        self.elapsed_time = time.time()
         if current_depth == 0:
-            print(f"AI: Best move utility {best_score}")
+            self.root_score = best_score
             return best_move
         return best_score
 
-    def _get_all_possible_moves(self, player) -> list[str]:
-        result: list[str] = []
-        bot_pawn_coordinates = self._get_all_pawn_coordinates(player)
-        for row_index, col_index in bot_pawn_coordinates:
-            start = self._translate_indexes_to_coordinates(row_index, col_index)
-            self.game._select_piece(row_index, col_index)
-            end_coordinates = [
-                self._translate_indexes_to_coordinates(row_index, col_index)
-                for row_index, row in enumerate(self.game.grid_display)
-                for col_index, col in enumerate(row)
-                if col == 3
-            ]
-            result.extend([f"{start}->{end}" for end in end_coordinates])
+    def _aspiration_search(self, max_depth: int) -> int | None:
+        """Searches the root with a window around the last iteration's score
 
-        return result
+        The window is widened and the root searched again whenever the score
+        lands on or outside it. Returns the best packed move at the root and
+        None once the thinking time has run out.
+        """
+        if max_depth == 0:
+            # return first move seen, -1 when there are no moves
+            moves = self._get_all_possible_moves(self.player)
+            return moves[0] if moves else -1
+
+        alpha, beta = -math.inf, math.inf
+        window = ASPIRATION_WINDOW
+        # workers of a parallel search raise alpha from the shared root
+        # alphas instead, a window could end up below them
+        if (
+            max_depth > 1
+            and self.root_score is not None
+            and math.isfinite(self.root_score)
+            and self.shared_root_alphas is None
+        ):
+            alpha, beta = self.root_score - window, self.root_score + window
+
+        while True:
+            self.following_principal_variation = True
+            score = self._principal_variation_search(max_depth, 0, alpha, beta)
+            if score is None:
+                return None
+            # a score on a bound is only a bound, the fail soft score says
+            # which way to look
+            window *= ASPIRATION_WIDENING
+            if score <= alpha and alpha != -math.inf:
+                alpha = score - window
+            elif score >= beta and beta != math.inf:
+                beta = score + window
+            else:
+                break
+
+        self.root_score = score
+        variation = self.ply_variations[0]
+        return variation[0] if variation else None
+
+    def _principal_variation_search(
+        self, max_depth: int, current_depth: int, alpha: float, beta: float
+    ) -> float | None:
+        """Negamax form of _minimax_search, searching all but the first move
+        with a null window
+
+        Scores are from the point of view of the player to move, and a score
+        on a bound cuts off. A move that beats the null window is searched
+        again with the full window. Returns None once the thinking time has
+        run out.
+        """
+        if self.timeout_set:
+            return None
+        self.nodes_searched += 1
+        time_manager = self.time_manager
+        if self.nodes_searched >= time_manager.next_check and time_manager.check(
+            self.nodes_searched
+        ):
+            self._set_timeout()
+            return None
+        ai_turn = (current_depth % 2) == 0
+        # board qualities and table scores are from the bot's point of view
+        sign = 1 if ai_turn else -1
+
+        if current_depth == max_depth:
+            self.boards_analyzed += 1
+            return sign * self._determine_board_quality()
+
+        self.ply_variations[current_depth] = []
+
+        table_move = None
+        if self.use_transposition_table:
+            entry = self.transposition_table.probe(self.game.position_key)
+            if entry is not None:
+                _, entry_depth, bound, entry_score, table_move = entry
+                if entry_depth >= max_depth - current_depth and current_depth > 0:
+                    score = sign * entry_score
+                    if bound == TranspositionTable.EXACT:
+                        return score
+                    # the opponent's lower bound is the bot's upper bound
+                    if (bound == TranspositionTable.LOWER_BOUND) == ai_turn:
+                        alpha = max(alpha, score)
+                    else:
+                        beta = min(beta, score)
+                    if alpha >= beta:
+                        return score
+        window_alpha, window_beta = alpha, beta
+
+        best_move: int | None = None
+        best_score = -math.inf
+
+        player = self.player if ai_turn else self.opponent
+        if current_depth == 0 and self.root_moves is not None:
+            moves = self.root_moves.copy()
+        else:
+            moves = self._get_all_possible_moves(player)
+
+        if self.use_batch_evaluation and current_depth == max_depth - 1 > 0:
+            best_move, best_score = self._search_frontier(
+                moves,
+                player,
+                current_depth,
+                max_depth,
+                alpha if ai_turn else -beta,
+                beta if ai_turn else -alpha,
+            )
+            best_score *= sign
+            moves = []  # every child is already scored
+        on_principal_variation = self.following_principal_variation
+        if self.use_move_ordering:
+            moves = self._order_moves(moves, player, current_depth, table_move)
+        elif table_move in moves:  # best move of the previous search goes first
+            moves.remove(table_move)
+            moves.insert(0, table_move)
+
+        for move in moves:
+            if current_depth == 0 and self.shared_root_alphas is not None:
+                # another worker may already have found a better root move
+                alpha = max(alpha, self.shared_root_alphas[max_depth])
+            root_alpha = alpha
+            # only the first child of a principal variation node continues it
+            self.following_principal_variation = (
+                on_principal_variation
+                and current_depth < len(self.principal_variation)
+                and move == self.principal_variation[current_depth]
+            )
+            self.game.apply_move(move)
+            if best_move is None:
+                result = self._principal_variation_search(
+                    max_depth, current_depth + 1, -beta, -alpha
+                )
+            else:
+                # only asks whether the move beats alpha, the next float up
+                # from alpha makes the window as narrow as it gets
+                result = self._principal_variation_search(
+                    max_depth,
+                    current_depth + 1,
+                    -math.nextafter(alpha, math.inf),
+                    -alpha,
+                )
+                if result is not None and alpha < -result < beta:
+                    result = self._principal_variation_search(
+                        max_depth, current_depth + 1, -beta, -alpha
+                    )
+            self.game.undo_move()
+
+            if result is None:
+                return None
+            score = -result
+
+            if current_depth == 0 and root_alpha < score < beta:
+                self._record_root_score(move, score, max_depth)
+
+            if score > best_score or best_move is None:
+                best_score = score
+                best_move = move
+                self._update_variation(current_depth, move)
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                self._record_cutoff(move, current_depth, max_depth)
+                break
+
+        # the root of a search over some of the root moves has no true score
+        if self.use_transposition_table and (
+            current_depth > 0 or self.root_moves is None
+        ):
+            if best_score <= window_alpha:
+                bound = TranspositionTable.UPPER_BOUND
+            elif best_score >= window_beta:
+                bound = TranspositionTable.LOWER_BOUND
+            else:
+                bound = TranspositionTable.EXACT
+            if not ai_turn and bound != TranspositionTable.EXACT:
+                bound = (
+                    TranspositionTable.UPPER_BOUND
+                    if bound == TranspositionTable.LOWER_BOUND
+                    else TranspositionTable.LOWER_BOUND
+                )
+            self.transposition_table.store(
+                self.game.position_key,
+                max_depth - current_depth,
+                bound,
+                sign * best_score,
+                best_move,
+            )
+
+        return best_score
 
-    def _get_all_pawn_coordinates(self, player) -> list[tuple[int, int]]:
-        return [
-            (row_index, col_index)
-            for row_index, row in enumerate(self.game.grid)
-            for col_index, col in enumerate(row)
-            if col == player
+    def _search_frontier(
+        self,
+        moves: list[int],
+        player: int,
+        current_depth: int,
+        max_depth: int,
+        alpha: float,
+        beta: float,
+    ) -> tuple[int | None, float]:
+        """Returns the best (move, score) of a node whose children are all leaves
+
+        The children are scored together by _evaluate_moves instead of being
+        made and searched one by one. The first best move in move order wins
+        ties, like in the search loop.
+        """
+        ai_turn = player == self.player
+        if not moves:
+            return None, -math.inf if ai_turn else math.inf
+
+        self.nodes_searched += len(moves)
+        self.boards_analyzed += len(moves)
+        scores = self._evaluate_moves(moves, player)
+        if np is not None and isinstance(scores, np.ndarray):
+            best_index = int(scores.argmax() if ai_turn else scores.argmin())
+        elif ai_turn:
+            best_index = max(range(len(moves)), key=scores.__getitem__)
+        else:
+            best_index = min(range(len(moves)), key=scores.__getitem__)
+        best_move, best_score = moves[best_index], float(scores[best_index])
+
+        self._update_variation(current_depth, best_move)
+        if self.use_alpha_beta_pruning and (
+            best_score > beta if ai_turn else best_score < alpha
+        ):
+            self._record_cutoff(best_move, current_depth, max_depth)
+        return best_move, best_score
+
+    def _evaluate_moves(
+        self, moves: list[int], player: int
+    ) -> Sequence[float] | np.ndarray:
+        """Returns the board quality after each of player's moves
+
+        Gives the same numbers as making each move and calling
+        _determine_board_quality, without touching the board. Large batches
+        are scored with numpy when it is installed and come back as an array.
+        """
+        game = self.game
+        opponent = 2 if player == 1 else 1
+        if player == 1:
+            player_score, opponent_score = game.player_1_score, game.player_2_score
+        else:
+            player_score, opponent_score = game.player_2_score, game.player_1_score
+        sign = 1 if self.player == 2 else -1
+
+        # the mover has won after the move when its last pawn outside the target
+        # camp moves in, or when all its pawns are in and the move stays inside
+        target_camp = game.target_camps[player]
+        pawn_squares = game.board.squares[player]
+        outside_count = len(pawn_squares) - game.pawns_in_camp[player]
+        mover_won = outside_count == 0
+        last_pawn = -1
+        if outside_count == 1:
+            last_pawn = next(
+                square for square in pawn_squares if not target_camp[square]
+            )
+        # the other side's pawns don't move, so its result is the same for all
+        opponent_won = game._check_victory(opponent)
+        mover_wins = math.inf if player == self.player else -math.inf
+        # the bot's own win counts first, see _determine_board_quality
+        mover_win_first = player == self.player
+
+        if np is not None and len(moves) >= NUMPY_BATCH_MIN_MOVES:
+            packed = np.array(moves)
+            starts, dests = packed >> 8, packed & 0xFF
+            table = get_camp_score_array(game.camps, player)
+            # same sums as _move_pawn and _determine_board_quality, so the
+            # floats match to the last bit
+            moved_score = player_score + (table[dests] - table[starts])
+            if player == 2:
+                score_array = sign * (moved_score - opponent_score)
+            else:
+                score_array = sign * (opponent_score - moved_score)
+            if opponent_won and mover_win_first:
+                score_array[:] = -mover_wins
+            if mover_won or last_pawn >= 0:
+                in_camp = get_camp_square_array(game.camps, opponent)[dests]
+                score_array[
+                    in_camp if mover_won else (starts == last_pawn) & in_camp
+                ] = mover_wins
+            if opponent_won and not mover_win_first:
+                score_array[:] = -mover_wins
+            return score_array
+
+        if opponent_won and not mover_win_first:
+            return [-mover_wins] * len(moves)
+
+        player_scores = game.camp_scores[player]
+        scores: list[float] = []
+        for move in moves:
+            start, dest = move >> 8, move & 0xFF
+            if (mover_won or start == last_pawn) and target_camp[dest]:
+                scores.append(mover_wins)
+            elif opponent_won:
+                scores.append(-mover_wins)
+            else:
+                moved_score = player_score + (
+                    player_scores[dest] - player_scores[start]
+                )
+                if player == 2:
+                    scores.append(sign * (moved_score - opponent_score))
+                else:
+                    scores.append(sign * (opponent_score - moved_score))
+        return scores
+
+    def _order_moves(
+        self, moves: list[int], player: int, current_depth: int, table_move: int | None
+    ) -> list[int]:
+        """Returns moves sorted so the likeliest cutoffs are searched first
+
+        The last iteration's principal variation move leads, then the
+        transposition table move and this ply's killer moves. The rest are
+        sorted by forward progress toward the camp, jumps first on ties, and
+        then by history score.
+        """
+        leading_moves: list[int] = []
+        if self.following_principal_variation and current_depth < len(
+            self.principal_variation
+        ):
+            leading_moves.append(self.principal_variation[current_depth])
+        if table_move is not None:
+            leading_moves.append(table_move)
+        leading_moves.extend(self.killer_moves[current_depth])
+
+        player_scores = self.game.camp_scores[player]
+        history_scores = self.history_scores
+        grid_size = self.game.grid_size
+
+        def order_key(move: int) -> tuple[float, bool, int]:
+            start, dest = move >> 8, move & 0xFF
+            is_jump = abs(dest - start) not in (
+                1,
+                grid_size - 1,
+                grid_size,
+                grid_size + 1,
+            )
+            progress = player_scores[dest] - player_scores[start]
+            return (progress, is_jump, history_scores[move])
+
+        ordered = sorted(moves, key=order_key, reverse=True)
+        for move in reversed(leading_moves):
+            if move in moves:
+                ordered.remove(move)
+                ordered.insert(0, move)
+
+        return ordered
+
+    def _record_root_score(self, move: int, score: float, max_depth: int) -> None:
+        """Keeps track of the best root move whose score is exact, not a bound"""
+        if self.root_best is None or score > self.root_best[1]:
+            self.root_best = (move, score)
+
+        if self.shared_root_alphas is not None:
+            with self.shared_root_alphas.get_lock():
+                if score > self.shared_root_alphas[max_depth]:
+                    self.shared_root_alphas[max_depth] = score
+
+    def _update_variation(self, current_depth: int, move: int) -> None:
+        self.ply_variations[current_depth] = [move] + self.ply_variations[
+            current_depth + 1
         ]
 
+    def _record_cutoff(self, move: int, current_depth: int, max_depth: int) -> None:
+        if current_depth not in self.pruned_at_depth:
+            self.pruned_at_depth[current_depth] = 0
+        self.pruned_at_depth[current_depth] += 1
+
+        killers = self.killer_moves[current_depth]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        remaining_depth = max_depth - current_depth
+        self.history_scores[move] += remaining_depth * remaining_depth
+
+    def _get_all_possible_moves(self, player) -> list[int]:
+        return self.game.get_legal_moves(player)
+
     def _determine_board_quality(self):
-        return (
-            math.inf
-            if self.game.player_2_score >= 10.0
-            else self.game.player_2_score - self.game.player_1_score
+        game = self.game
+        # counted pawns, summed scores can be a rounding error off 10.0
+        pawns_in_camp, squares = game.pawns_in_camp, game.board.squares
+        if pawns_in_camp[self.player] == len(squares[self.player]):
+            return math.inf
+        if pawns_in_camp[self.opponent] == len(squares[self.opponent]):
+            return -math.inf
+
+        score_difference = game.player_2_score - game.player_1_score
+        return score_difference if self.player == 2 else -score_difference
+
+
+# stop flag and shared root alphas of the parallel search, set once per
+# worker process, see SearchBot._run_workers
+_worker_stop_event = None
+_worker_shared_root_alphas = None
+
+
+def _initialize_search_worker(stop_event, shared_root_alphas) -> None:
+    global _worker_stop_event, _worker_shared_root_alphas
+    _worker_stop_event = stop_event
+    _worker_shared_root_alphas = shared_root_alphas
+
+
+def _search_root_moves(
+    grid: list[list[int]],
+    root_moves: list[int],
+    player: int,
+    deadline: float,
+    transposition_table_mb: float,
+    settings: dict[str, object],
+) -> dict:
+    """Runs iterative deepening over some root moves in a worker process
+
+    Returns the nodes searched, the boards analyzed, the deepest finished
+    depth, the best exact (move, score) of each finished depth and the
+    transposition table counts.
+    """
+    game = GameState(len(grid), BitBoard.from_grid(grid))
+    game.player_turn = player
+    bot = HalmaBot2000(game, 1, None, transposition_table_mb)
+    for setting, value in settings.items():
+        setattr(bot, setting, value)
+    bot.root_moves = root_moves
+    bot.shared_root_alphas = _worker_shared_root_alphas
+    bot.stop_event = _worker_stop_event
+    bot.thinking_time = deadline - time.monotonic()
+    _ = bot.determine_best_move()
+
+    table = bot.transposition_table
+    return {
+        "nodes": bot.nodes_searched,
+        "leaf_evaluations": bot.boards_analyzed,
+        "depth": max(bot.completed_iterations, default=0),
+        "iterations": bot.completed_iterations,
+        "table": (table.probes, table.hits, table.collisions, table.stores),
+    }
+
+
+class MonteCarloNode:
+    """A position in MonteCarloBot's tree, reached by move from its parent"""
+
+    __slots__ = (
+        "move",
+        "player",
+        "key",
+        "children",
+        "untried_moves",
+        "visits",
+        "value",
+    )
+
+    def __init__(self, move: int, player: int, key: int):
+        self.move: int = move  # -1 at the root
+        self.player: int = player  # who played move
+        self.key: int = key  # position key, finds the node again for tree reuse
+        self.children: list[MonteCarloNode] = []
+        # legal moves that have no child yet, None until the node is expanded
+        self.untried_moves: list[int] | None = None
+        self.visits: int = 0
+        # summed playout results for player, 1 a sure win and 0 a sure loss
+        self.value: float = 0.0
+
+
+class MonteCarloBot(SearchBot):
+    """Monte Carlo tree search bot, an alternative to HalmaBot2000's minimax
+
+    Each playout walks down the tree picking children by UCT, adds one node
+    and plays a few fast moves from it, each the most forward move of a few
+    random pawns. The camp score lead at the end, squashed to 0..1, is
+    backed up the path. The tree below the position the game reaches is kept
+    for the next move, so it doesn't ponder. nodes_searched counts tree
+    nodes added and boards_analyzed playouts.
+    """
+
+    def __init__(
+        self,
+        master_game: GameState,
+        thinking_time: int,
+        worker_count: int | None = None,
+    ):
+        super().__init__(master_game, thinking_time, worker_count)
+        # stop after this many playouts even if there is time left
+        self.max_playouts: int | None = None
+
+        self.exploration: float = UCT_EXPLORATION
+        self.playout_plies: int = PLAYOUT_PLIES
+        self.playout_pawn_samples: int = PLAYOUT_PAWN_SAMPLES
+        self.use_tree_reuse: bool = True
+        self.root: MonteCarloNode | None = None
+        self.rng: random.Random = random.Random()
+        # use_parallel_search grows a tree from the root in every worker
+        # process and adds up the visits of each root move, see
+        # _search_monte_carlo_tree
+
+    def search(self) -> tuple[int, SearchStats]:
+        """Returns the best move found through searching and how it was found
+
+        The move is -1 when the player has no legal moves.
+        """
+        if self.use_parallel_search and self.worker_count > 1:
+            return self._search_parallel()
+
+        self.nodes_searched = 0
+        self.boards_analyzed = 0
+        self.time_manager = TimeManager(
+            self.thinking_time, MONTE_CARLO_CHECK_INTERVAL, self.stop_event
+        )
+        root = self.root = self._find_root()
+        depth = 0
+
+        if self.game.get_legal_moves(self.player):
+            # the first playout always runs, so the root has a move to give
+            depth = self._run_playout(root)
+            while not self.timeout_set:
+                if self.max_playouts is not None and (
+                    self.boards_analyzed >= self.max_playouts
+                ):
+                    break
+                if self.boards_analyzed >= self.time_manager.next_check and (
+                    self.time_manager.check(self.boards_analyzed)
+                ):
+                    break
+                depth = max(depth, self._run_playout(root))
+
+        variation: list[int] = []
+        node = root
+        while node.children:
+            node = max(node.children, key=lambda child: child.visits)
+            variation.append(node.move)
+        best_child = max(root.children, key=lambda child: child.visits, default=None)
+
+        self.stats = SearchStats(
+            self.game.grid_size,
+            self.player,
+            move=best_child.move if best_child else -1,
+            score=best_child.value / best_child.visits if best_child else None,
+            depth=depth,
+            nodes=self.nodes_searched,
+            leaf_evaluations=self.boards_analyzed,
+            seconds=self.time_manager.elapsed(),
+            principal_variation=variation,
+        )
+        self.timeout_set = False  # ready for the next search
+        self._finish_search(self.stats)
+        return self.stats.move, self.stats
+
+    def _find_root(self) -> MonteCarloNode:
+        """Returns the tree node of the current position, a new one if there is none
+
+        The position is looked for up to two plies below the last root, after
+        the bot's move and the opponent's answer.
+        """
+        key = self.game.position_key
+        root = self.root
+        if self.use_tree_reuse and root is not None:
+            for node in (root, *root.children):
+                if node.key == key:
+                    return node
+                for child in node.children:
+                    if child.key == key:
+                        return child
+        return MonteCarloNode(-1, self.opponent, key)
+
+    def _run_playout(self, root: MonteCarloNode) -> int:
+        """Selects, expands, plays out and backs up once, returns the path length"""
+        game = self.game
+        path = [root]
+        node = root
+
+        # a node is fully expanded once every legal move has a child
+        while node.untried_moves == [] and node.children:
+            node = self._select_child(node)
+            game.apply_move(node.move)
+            path.append(node)
+
+        if node.untried_moves is None:
+            node.untried_moves = self._get_untried_moves()
+        if node.untried_moves:
+            move = node.untried_moves.pop()
+            mover = game.player_turn
+            game.apply_move(move)
+            child = MonteCarloNode(move, mover, game.position_key)
+            node.children.append(child)
+            path.append(child)
+            self.nodes_searched += 1
+
+        result = self._play_out()
+        for _ in range(len(path) - 1):
+            game.undo_move()
+
+        for node in path:
+            node.visits += 1
+            node.value += result if node.player == self.player else 1.0 - result
+        return len(path) - 1
+
+    def _select_child(self, node: MonteCarloNode) -> MonteCarloNode:
+        log_visits = math.log(node.visits)
+        exploration = self.exploration
+        return max(
+            node.children,
+            key=lambda child: child.value / child.visits
+            + exploration * math.sqrt(log_visits / child.visits),
         )
 
-    def _translate_indexes_to_coordinates(self, row_index: int, col_index: int):
-        return f"{chr(ord('a') + col_index)}{row_index + 1}"
+    def _get_untried_moves(self) -> list[int]:
+        """Returns the legal moves of the player to move, the most forward last
+
+        The last move is expanded first. A won position has no moves.
+        """
+        game = self.game
+        if game._check_victory(1) or game._check_victory(2):
+            return []
+        player_scores = game.camp_scores[game.player_turn]
+        return sorted(
+            game.get_legal_moves(game.player_turn),
+            key=lambda move: player_scores[move & 0xFF] - player_scores[move >> 8],
+        )
 
-    def _set_timeout(self):
-        self.timeout_set = True
+    def _play_out(self) -> float:
+        """Plays a few fast moves from the current position, returns its result
+
+        The moves are undone before returning.
+        """
+        game = self.game
+        plies = 0
+        while plies < self.playout_plies:
+            if game._check_victory(1) or game._check_victory(2):
+                break
+            move = self._choose_playout_move(game.player_turn)
+            if move < 0:
+                break
+            game.apply_move(move)
+            plies += 1
+
+        self.boards_analyzed += 1
+        result = self._get_playout_result()
+        for _ in range(plies):
+            game.undo_move()
+        return result
+
+    def _choose_playout_move(self, player: int) -> int:
+        """Returns the most forward move of a few random pawns of player
+
+        Uses the per square camp_scores. Pawns are tried
+        in random order until one can move, -1 if none can.
+        """
+        game = self.game
+        player_scores = game.camp_scores[player]
+        pawn_squares = game.board.squares[player]
+        best_move, best_progress = -1, -math.inf
+        sampled = 0
+        forward_masks = game.forward_masks[player]
+        for start in self.rng.sample(pawn_squares, len(pawn_squares)):
+            # playout positions rarely repeat, so _get_valid_destinations's
+            # cache would mostly miss
+            destinations = game.board.get_destinations(start) & forward_masks[start]
+            if not destinations:
+                continue
+            for dest in iter_squares(destinations):
+                progress = player_scores[dest] - player_scores[start]
+                if progress > best_progress:
+                    best_move, best_progress = encode_move(start, dest), progress
+            sampled += 1
+            if sampled == self.playout_pawn_samples:
+                break
+        return best_move
+
+    def _get_playout_result(self) -> float:
+        """Returns how likely the bot is to win from the position, 0 to 1"""
+        game = self.game
+        if game._check_victory(self.player):
+            return 1.0
+        if game._check_victory(self.opponent):
+            return 0.0
+        lead = game.player_2_score - game.player_1_score
+        if self.player == 1:
+            lead = -lead
+        return 1 / (1 + math.exp(-lead / PLAYOUT_LEAD_SCALE))
+
+    def _search_parallel(self) -> tuple[int, SearchStats]:
+        """Returns the most visited root move over trees grown in worker processes"""
+        self.time_manager = TimeManager(self.thinking_time)
+        deadline = self._get_worker_deadline()
+        if not self.game.get_legal_moves(self.player):
+            self.stats = SearchStats(self.game.grid_size, self.player)
+            self._finish_search(self.stats)
+            return -1, self.stats
+
+        settings = {
+            "exploration": self.exploration,
+            "playout_plies": self.playout_plies,
+            "playout_pawn_samples": self.playout_pawn_samples,
+            "max_playouts": (
+                None
+                if self.max_playouts is None
+                else -(-self.max_playouts // self.worker_count)
+            ),
+        }
+        grid = self.game.grid
+        reports = self._run_workers(
+            _search_monte_carlo_tree,
+            [
+                (grid, self.player, deadline, settings, self.rng.getrandbits(32))
+                for _ in range(self.worker_count)
+            ],
+        )
+
+        visits: dict[int, int] = {}
+        values: dict[int, float] = {}
+        for report in reports:
+            for move, (move_visits, move_value) in report["children"].items():
+                visits[move] = visits.get(move, 0) + move_visits
+                values[move] = values.get(move, 0.0) + move_value
+        best_move = max(visits, key=visits.__getitem__)
+        self.nodes_searched = sum(report["nodes"] for report in reports)
+        self.boards_analyzed = sum(report["leaf_evaluations"] for report in reports)
+
+        self.stats = SearchStats(
+            self.game.grid_size,
+            self.player,
+            move=best_move,
+            score=values[best_move] / visits[best_move],
+            depth=max(report["depth"] for report in reports),
+            nodes=self.nodes_searched,
+            leaf_evaluations=self.boards_analyzed,
+            seconds=self.time_manager.elapsed(),
+            principal_variation=[best_move],
+            workers=[
+                {key: report[key] for key in ("nodes", "leaf_evaluations", "depth")}
+                for report in reports
+            ],
+        )
+        self.timeout_set = False
+        self._finish_search(self.stats)
+        return best_move, self.stats
+
+    def _finish_search(self, stats: SearchStats) -> None:
+        self._report_stats({"event": "search", **stats.to_dict()})
+        if not self.verbose:
+            return
+
+        for worker_index, worker in enumerate(stats.workers):
+            print(
+                f"Worker {worker_index}: {worker['leaf_evaluations']} playouts, depth {worker['depth']} reached"
+            )
+        print(
+            f"Total playouts: {stats.leaf_evaluations} in {stats.seconds:.4f} seconds, {stats.nodes} nodes added, depth {stats.depth} reached"
+        )
+        if stats.move >= 0:
+            print(
+                f"making move {format_move(stats.move, self.game.grid_size)}, win chance {stats.score:.2f}"
+            )
+
+
+def _search_monte_carlo_tree(
+    grid: list[list[int]],
+    player: int,
+    deadline: float,
+    settings: dict[str, object],
+    seed: int,
+) -> dict:
+    """Grows one tree from the root in a worker process
+
+    Returns the playouts, nodes added, deepest path and the (visits, value)
+    of every root move.
+    """
+    game = GameState(len(grid), BitBoard.from_grid(grid))
+    game.player_turn = player
+    bot = MonteCarloBot(game, 1)
+    bot.stop_event = _worker_stop_event
+    bot.thinking_time = deadline - time.monotonic()
+    for setting, value in settings.items():
+        setattr(bot, setting, value)
+    bot.rng.seed(seed)
+    _ = bot.determine_best_move()
+
+    return {
+        "nodes": bot.nodes_searched,
+        "leaf_evaluations": bot.boards_analyzed,
+        "depth": bot.stats.depth,
+        "children": {
+            child.move: (child.visits, child.value) for child in bot.root.children
+        },
+    }
+
+
+def create_bot(
+    master_game: GameState,
+    thinking_time: int,
+    engine: str | None = None,
+    transposition_table_mb: float = 16,
+) -> SearchBot:
+    """Returns a bot of the named engine, "minimax" or "mcts"
+
+    Without a name the engine is BOT_ENGINES's pick for the board size.
+    """
+    engine = engine or BOT_ENGINES.get(master_game.grid_size, "minimax")
+    if engine == "minimax":
+        return HalmaBot2000(master_game, thinking_time, None, transposition_table_mb)
+    if engine == "mcts":
+        return MonteCarloBot(master_game, thinking_time)
+    raise ValueError(f"unknown engine {engine!r}")
+
+
+class EngineSession:
+    """Speaks the line protocol of python halma.py --engine
+
+    One command per line in, answers and search output line by line out:
+
+        isready                           -> readyok
+        position startpos SIZE [moves M ...]
+        position board ROWS PLAYER [moves M ...]
+            ROWS as read by parse_board, PLAYER is the player to move
+        set OPTION VALUE                  bot attribute, VALUE is json
+        newgame                           forgets earlier searches
+        go [time SECONDS] [depth N]       -> info lines, then bestmove M
+        stop                              the running search answers now
+        quit
+
+    Moves are written like a1->b2. Every finished iteration of a search
+    sends "info depth D nodes N score S time T pv M ...". Without a time or
+    depth, go searches until stop. Bots are kept for the life of the process
+    so their transposition tables stay warm between searches. A bad command
+    is answered with "error ...".
+    """
+
+    def __init__(self, output: TextIO):
+        self.output: TextIO = output
+        # the search thread writes too, lines must not interleave
+        self.output_lock: threading.Lock = threading.Lock()
+        self.position: GameState = GameState(8)
+        # one bot per (grid size, player), table scores are from the bot's side
+        self.bots: dict[tuple[int, int], HalmaBot2000] = {}
+        self.options: dict[str, object] = {}
+        self.search_thread: threading.Thread | None = None
+        self.searching_bot: HalmaBot2000 | None = None
+
+    def run(self, lines: Iterable[str]) -> None:
+        """Answers commands until quit or the end of the input"""
+        for line in lines:
+            words = line.split()
+            if not words:
+                continue
+            if words[0] == "quit":
+                break
+            try:
+                self.handle(words[0], words[1:])
+            except ValueError as error:
+                self.send(f"error {error}")
+
+        self._stop_search()
+
+    def handle(self, command: str, arguments: list[str]) -> None:
+        if command == "isready":
+            self.send("readyok")
+        elif command == "stop":
+            self._stop_search()
+        elif self.searching_bot is not None:
+            raise ValueError(f"can't {command} during a search, send stop first")
+        elif command == "position":
+            self._set_position(arguments)
+        elif command == "set":
+            self._set_option(arguments)
+        elif command == "newgame":
+            self.bots.clear()
+        elif command == "go":
+            self._go(arguments)
+        else:
+            raise ValueError(f"unknown command {command!r}")
+
+    def send(self, line: str) -> None:
+        with self.output_lock:
+            _ = self.output.write(line + "\n")
+            self.output.flush()
+
+    def _set_position(self, arguments: list[str]) -> None:
+        if arguments[:1] == ["startpos"] and len(arguments) >= 2:
+            grid_size = _parse_number(arguments[1], int)
+            if grid_size not in (8, 10, 16):
+                raise ValueError("board size may only be 8, 10, or 16")
+            position = GameState(grid_size)
+            arguments = arguments[2:]
+        elif arguments[:1] == ["board"] and len(arguments) >= 3:
+            grid = parse_board(arguments[1])
+            position = GameState(len(grid), BitBoard.from_grid(grid))
+            position.player_turn = _parse_number(arguments[2], int)
+            if position.player_turn not in (1, 2):
+                raise ValueError("the player to move must be 1 or 2")
+            arguments = arguments[3:]
+        else:
+            raise ValueError(
+                "expected position startpos SIZE or position board ROWS PLAYER"
+            )
+
+        if arguments[:1] == ["moves"]:
+            for text in arguments[1:]:
+                move = parse_move(text, position.grid_size)
+                if move not in position.get_legal_moves(position.player_turn):
+                    raise ValueError(f"illegal move {text}")
+                position.apply_move(move)
+        elif arguments:
+            raise ValueError(f"unexpected {arguments[0]!r} after the position")
+
+        position.move_stack.clear()  # nothing is undone past the position
+        self.position = position
+
+    def _set_option(self, arguments: list[str]) -> None:
+        if len(arguments) != 2:
+            raise ValueError("expected set OPTION VALUE")
+        option, text = arguments
+        if not hasattr(self._get_bot(), option):
+            raise ValueError(f"HalmaBot2000 has no option {option!r}")
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            value = text  # plain string value
+        self.options[option] = value
+        for bot in self.bots.values():
+            setattr(bot, option, value)
+
+    def _go(self, arguments: list[str]) -> None:
+        limits = dict(zip(arguments[::2], arguments[1::2]))
+        if len(arguments) % 2 or not set(limits) <= {"time", "depth"}:
+            raise ValueError("expected go [time SECONDS] [depth N]")
+        seconds = _parse_number(limits.get("time", "inf"), float)
+        depth = _parse_number(limits["depth"], int) if "depth" in limits else None
+
+        bot = self._get_bot()
+        # -100 ms like HalmaBot2000, so the answer arrives in time
+        bot.move_thinking_time = max(0.0, seconds - 0.1)
+        bot.set_position(self.position)
+        bot.max_depth = depth
+        bot.stats_callback = lambda record: self._send_info(bot, record)
+
+        self.searching_bot = bot
+        self.search_thread = threading.Thread(
+            target=self._search, args=(bot,), daemon=True
+        )
+        self.search_thread.start()
+
+    def _search(self, bot: HalmaBot2000) -> None:
+        move = -1
+        try:
+            move = bot.determine_best_move()
+        finally:
+            # the session must take commands again even if the search failed
+            self.searching_bot = None
+            self.send(
+                "bestmove "
+                + (format_move(move, bot.game.grid_size) if move >= 0 else "none")
+            )
+
+    def _send_info(self, bot: HalmaBot2000, record: dict) -> None:
+        if record["event"] != "iteration":
+            return
+        self.send(
+            f"info depth {record['depth']} nodes {bot.nodes_searched}"
+            f" score {record['score']:.6f} time {bot.time_manager.elapsed():.3f}"
+            f" pv {' '.join(record['principal_variation'])}"
+        )
+
+    def _stop_search(self) -> None:
+        """Ends the running search, its bestmove is sent before this returns"""
+        if self.searching_bot is not None:
+            self.searching_bot._set_timeout()
+        if self.search_thread is not None:
+            self.search_thread.join()  # returns within a node or two
+
+    def _get_bot(self) -> HalmaBot2000:
+        key = (self.position.grid_size, self.position.player_turn)
+        if key not in self.bots:
+            bot = HalmaBot2000(self.position, 1, None)
+            for option, value in self.options.items():
+                setattr(bot, option, value)
+            self.bots[key] = bot
+        return self.bots[key]
+
+
+def _parse_number(text: str, number_type: type) -> int | float:
+    try:
+        return number_type(text)
+    except ValueError:
+        raise ValueError(f"expected a number, got {text!r}") from None
 
 
 if __name__ == "__main__":
+    if sys.argv[1:] == ["--engine"]:
+        EngineSession(sys.stdout).run(sys.stdin)
+        sys.exit(0)
+
     board_size: int
     timeout: int
     player_color: str
@@ -700,5 +2521,10 @@ if __name__ == "__main__":
         sys.exit(3)
 
     game = Halma(board_size, timeout, player_color)
+    # optional file the game is recorded to, see game_record.py
+    if len(sys.argv) > 4:
+        game.record_to(GameRecordWriter(sys.argv[4]))
     game.start_game()
+    if game.game_record is not None:
+        game.game_record.close()
     sys.exit(0)
@@ -0,0 +1,115 @@
+import argparse
+import sys
+import time
+
+from halma import OPENING_BOOK_PATH, Halma, HalmaBot2000, OpeningBook, format_move
+
+
+def search_position(game: Halma, depth: int, thinking_time: float) -> int:
+    """Returns the move a deep search picks for the player to move"""
+    bot = HalmaBot2000(game, thinking_time, None)
+    bot.max_depth = depth
+    bot.use_opening_book = False  # don't answer from the book being built
+    return bot.determine_best_move()
+
+
+def get_likely_moves(game: Halma, count: int) -> list[int]:
+    """Returns the count moves that make the most forward progress"""
+    player = game.player_turn
+    player_scores = game.camp_scores[player]
+    moves = game.get_legal_moves(player)
+    moves.sort(
+        key=lambda move: player_scores[move & 0xFF] - player_scores[move >> 8],
+        reverse=True,
+    )
+    return moves[:count]
+
+
+def generate_book(
+    grid_size: int,
+    plies: int,
+    depth: int,
+    branching: int,
+    thinking_time: float,
+    entries: dict[int, int],
+) -> None:
+    """Adds the searched best move of the opening positions of a board size
+
+    Every position within plies moves of the start is searched, following the
+    book move and the branching - 1 other most forward moves of either side.
+    Positions reached by more than one move order are searched once.
+    """
+    game = Halma(grid_size, 1, "red", headless=True)
+    start_time = time.time()
+    positions = 0
+
+    def visit(ply: int) -> None:
+        nonlocal positions
+        key = game.position_key
+        book_move = entries.get(key)
+        if book_move is None:
+            book_move = search_position(game, depth, thinking_time)
+            if book_move < 0:
+                return  # no legal moves
+            entries[key] = book_move
+            positions += 1
+            print(
+                f"{grid_size}x{grid_size} ply {ply}: "
+                f"{format_move(book_move, grid_size)} "
+                f"({positions} positions, {time.time() - start_time:.0f}s)",
+                file=sys.stderr,
+            )
+        if ply == plies:
+            return
+
+        replies = [book_move] + [
+            move for move in get_likely_moves(game, branching) if move != book_move
+        ][: branching - 1]
+        for move in replies:
+            game.apply_move(move)
+            visit(ply + 1)
+            game.undo_move()
+
+    visit(0)
+
+
+def _parse_arguments(arguments: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Search the opening positions and write them as an opening book"
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", choices=(8, 10, 16), default=[8, 10, 16]
+    )
+    parser.add_argument(
+        "--plies", type=int, default=4, help="moves from the start kept in the book"
+    )
+    parser.add_argument("--depth", type=int, default=5, help="search depth per move")
+    parser.add_argument(
+        "--branching",
+        type=int,
+        default=3,
+        help="moves followed from each position, the book move included",
+    )
+    parser.add_argument(
+        "--time", type=float, default=60.0, help="most seconds per position"
+    )
+    parser.add_argument("--output", default=OPENING_BOOK_PATH)
+    return parser.parse_args(arguments)
+
+
+if __name__ == "__main__":
+    arguments = _parse_arguments(sys.argv[1:])
+    entries: dict[int, int] = {}
+    for grid_size in arguments.sizes:
+        generate_book(
+            grid_size,
+            arguments.plies,
+            arguments.depth,
+            arguments.branching,
+            arguments.time,
+            entries,
+        )
+
+    OpeningBook.write(arguments.output, entries)
+    print(f"{len(entries)} positions written to {arguments.output}")
+    sys.exit(0)
@@ -0,0 +1,277 @@
+import argparse
+import json
+import math
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+
+from game_record import GameRecordWriter
+from halma import Halma, SearchBot, create_bot
+
+
+@dataclass
+class BotConfig:
+    """Settings for one side of a match, options are set on the bot by name"""
+
+    name: str
+    thinking_time: float = 1.0
+    max_depth: int | None = None
+    transposition_table_mb: float = 16
+    options: dict[str, object] = field(default_factory=dict)
+    # "minimax" or "mcts", see create_bot
+    engine: str = "minimax"
+
+    def create_bot(self, game: Halma) -> SearchBot:
+        bot = create_bot(
+            game, self.thinking_time, self.engine, self.transposition_table_mb
+        )
+        options = dict(self.options)
+        if self.max_depth is not None:
+            options["max_depth"] = self.max_depth
+        for option, value in options.items():
+            if not hasattr(bot, option):
+                raise ValueError(f"{type(bot).__name__} has no option {option!r}")
+            setattr(bot, option, value)
+        return bot
+
+
+def play_game(
+    game_index: int,
+    grid_size: int,
+    first_bot: BotConfig,
+    second_bot: BotConfig,
+    move_limit: int,
+) -> dict:
+    """Plays one headless game, first_bot moves first as player 1
+
+    The game is drawn once move_limit moves have been played without a winner.
+    The packed moves played are returned under "record".
+    """
+    game = Halma(grid_size, 1, "red", headless=True)
+    configs = {1: first_bot, 2: second_bot}
+    # each side keeps its bot, so its table or tree carries over between moves
+    bots: dict[int, SearchBot] = {}
+    thinking_times: dict[int, float] = {1: 0.0, 2: 0.0}
+    moves: list[int] = []
+    result = "move limit"
+    start_time = time.time()
+
+    while game.winner is None and game.turn_number < move_limit:
+        player = game.player_turn
+        legal_moves = game.get_legal_moves(player)
+        if not legal_moves:
+            result = "no legal moves"
+            break
+
+        if player in bots:
+            bot = bots[player]
+            bot.set_position(game)
+        else:
+            bot = bots[player] = configs[player].create_bot(game)
+        move_start_time = time.time()
+        move = bot.determine_best_move()
+        thinking_times[player] += time.time() - move_start_time
+
+        game._process_move_input(robo_move=move)
+        if game.player_turn == player:
+            raise RuntimeError(f"{configs[player].name} played an illegal move")
+        moves.append(move)
+
+    if game.winner is not None:
+        result = "victory"
+
+    return {
+        "game": game_index,
+        "grid_size": grid_size,
+        "player_1": first_bot.name,
+        "player_2": second_bot.name,
+        "winner": configs[game.winner].name if game.winner else None,
+        "result": result,
+        "moves": game.turn_number,
+        "player_1_score": round(game.player_1_score, 4),
+        "player_2_score": round(game.player_2_score, 4),
+        "player_1_thinking_time": round(thinking_times[1], 3),
+        "player_2_thinking_time": round(thinking_times[2], 3),
+        "duration": round(time.time() - start_time, 3),
+        "record": moves,
+    }
+
+
+def run_tournament(
+    bot_a: BotConfig,
+    bot_b: BotConfig,
+    game_count: int,
+    grid_size: int = 8,
+    move_limit: int = 300,
+    jobs: int | None = None,
+    output_path: str | None = None,
+    records_path: str | None = None,
+) -> dict:
+    """Plays game_count games between two bots in parallel processes
+
+    The bots swap colors every game. Each finished game is appended to
+    output_path as a json line and its moves to the game record file at
+    records_path, the aggregate results are returned.
+    """
+    games: list[dict] = []
+    output = open(output_path, "w") if output_path else None
+    records = GameRecordWriter(records_path) if records_path else None
+    # the seconds per move stored in the records, whole seconds
+    record_timeout = math.ceil(max(bot_a.thinking_time, bot_b.thinking_time))
+
+    try:
+        with ProcessPoolExecutor(jobs) as pool:
+            futures = [
+                pool.submit(
+                    play_game,
+                    game_index,
+                    grid_size,
+                    bot_a if game_index % 2 == 0 else bot_b,
+                    bot_b if game_index % 2 == 0 else bot_a,
+                    move_limit,
+                )
+                for game_index in range(game_count)
+            ]
+            for future in as_completed(futures):
+                game = future.result()
+                moves = game.pop("record")
+                games.append(game)
+                if records:
+                    winning_player = {game["player_1"]: 1, game["player_2"]: 2}.get(
+                        game["winner"]
+                    )
+                    records.write_game(grid_size, record_timeout, winning_player, moves)
+                if output:
+                    output.write(json.dumps(game) + "\n")
+                    output.flush()
+    finally:
+        if output:
+            output.close()
+        if records:
+            records.close()
+
+    games.sort(key=lambda game: game["game"])
+    return summarize(games, bot_a, bot_b)
+
+
+def summarize(games: list[dict], bot_a: BotConfig, bot_b: BotConfig) -> dict:
+    game_count = len(games)
+    summary: dict = {
+        "games": game_count,
+        "draws": sum(1 for game in games if game["winner"] is None),
+        "average_moves": (
+            sum(game["moves"] for game in games) / game_count if game_count else 0.0
+        ),
+        "bots": {},
+    }
+
+    for bot in (bot_a, bot_b):
+        wins = sum(1 for game in games if game["winner"] == bot.name)
+        wins_as_player_1 = sum(
+            1
+            for game in games
+            if game["winner"] == bot.name and game["player_1"] == bot.name
+        )
+        summary["bots"][bot.name] = {
+            "config": asdict(bot),
+            "wins": wins,
+            "wins_as_player_1": wins_as_player_1,
+            "wins_as_player_2": wins - wins_as_player_1,
+            "win_rate": wins / game_count if game_count else 0.0,
+        }
+
+    return summary
+
+
+def parse_option(text: str) -> tuple[str, object]:
+    option, separator, value = text.partition("=")
+    if not separator:
+        raise argparse.ArgumentTypeError(f"expected OPTION=VALUE, got {text!r}")
+    try:
+        return option, json.loads(value)
+    except json.JSONDecodeError:
+        return option, value  # plain string value
+
+
+def _parse_arguments(arguments: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Play headless Halma games between two bot configurations"
+    )
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--size", type=int, choices=(8, 10, 16), default=8)
+    parser.add_argument(
+        "--move-limit", type=int, default=300, help="total moves before a draw"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=None, help="games played at once (cpu count)"
+    )
+    parser.add_argument("--output", help="json lines file of per game results")
+    parser.add_argument("--summary", help="json file of the aggregate results")
+    parser.add_argument("--records", help="game record file the moves are added to")
+
+    for side in ("a", "b"):
+        parser.add_argument(f"--name-{side}", default=f"bot_{side}")
+        parser.add_argument(
+            f"--time-{side}", type=float, default=1.0, help="seconds per move"
+        )
+        parser.add_argument(
+            f"--depth-{side}", type=int, default=None, help="maximum search depth"
+        )
+        parser.add_argument(f"--table-mb-{side}", type=float, default=16)
+        parser.add_argument(
+            f"--engine-{side}", choices=("minimax", "mcts"), default="minimax"
+        )
+        parser.add_argument(
+            f"--set-{side}",
+            type=parse_option,
+            action="append",
+            default=[],
+            metavar="OPTION=VALUE",
+            help="bot attribute to override, e.g. use_move_ordering=false",
+        )
+
+    parsed = parser.parse_args(arguments)
+    for side in ("a", "b"):
+        # the bots keep 0.1 s of each move for themselves
+        if getattr(parsed, f"time_{side}") <= 0.1:
+            parser.error(f"--time-{side} must be more than 0.1 seconds")
+    return parsed
+
+
+if __name__ == "__main__":
+    arguments = _parse_arguments(sys.argv[1:])
+    bot_a, bot_b = (
+        BotConfig(
+            name=getattr(arguments, f"name_{side}"),
+            thinking_time=getattr(arguments, f"time_{side}"),
+            max_depth=getattr(arguments, f"depth_{side}"),
+            transposition_table_mb=getattr(arguments, f"table_mb_{side}"),
+            options=dict(getattr(arguments, f"set_{side}")),
+            engine=getattr(arguments, f"engine_{side}"),
+        )
+        for side in ("a", "b")
+    )
+    if bot_a.name == bot_b.name:
+        print("the two bots need different names")
+        sys.exit(1)
+
+    summary = run_tournament(
+        bot_a,
+        bot_b,
+        arguments.games,
+        arguments.size,
+        arguments.move_limit,
+        arguments.jobs,
+        arguments.output,
+        arguments.records,
+    )
+
+    if arguments.summary:
+        with open(arguments.summary, "w") as summary_file:
+            json.dump(summary, summary_file, indent=2)
+
+    print(f"{summary['games']} games, {summary['draws']} draws")
+    for name, results in summary["bots"].items():
+        print(f"  {name}: {results['wins']} wins ({results['win_rate']:.1%})")
+    sys.exit(0)